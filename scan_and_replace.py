@@ -1,59 +1,590 @@
 #!/usr/bin/env python3
-'''Scan all files with a given `suffix` in a given `path` recursively.
+'''Scan all files with given suffixes in a given `path` recursively.
 '''
 
 import argparse
+import array
+import bisect
+import collections
+import concurrent.futures
+import contextlib
+import fnmatch
+import itertools
+import mmap
+import os
 import pathlib
+import re
+import shutil
+import struct
 import sys
+import tempfile
 
 
-def scan_and_print(paths: list, suffix: str, old_word: str):
-    '''Scan a word in all files with a given list of paths.
+# Folders skipped by default, which are rarely worth scanning.
+DEFAULT_EXCLUDES = ['.git/', '.hg/', '.svn/', 'node_modules/',
+    '__pycache__/', 'build/']
+
+
+def excluded(relative_name: str, is_dir: bool, excludes: list):
+    '''Return whether a path relative to the root matches any exclude pattern.
+
+    Patterns follow `.gitignore` loosely: a pattern ending with '/' only
+    matches folders, a pattern containing '/' matches the whole relative
+    path, and any other pattern matches the last part of the path.
+    '''
+    name = relative_name.rpartition('/')[2]
+    for pattern in excludes:
+        if pattern.endswith('/'):
+            if not is_dir:
+                continue
+            pattern = pattern[:-1]
+        if '/' in pattern:
+            if fnmatch.fnmatchcase(relative_name, pattern.lstrip('/')):
+                return True
+        elif fnmatch.fnmatchcase(name, pattern):
+            return True
+    return False
+
+
+def is_binary(path: str, sniff_size: int = 8192):
+    '''Return whether a file has a NUL byte in its first `sniff_size` bytes.
+    '''
+    with open(path, 'rb') as file:
+        return b'\0' in file.read(sniff_size)
+
+
+def walk(root: pathlib.Path, suffixes: list, excludes: list = None):
+    '''Yield all text files with given `suffixes` in `root` recursively.
+
+    Folders matching `excludes` are pruned without being entered, and files
+    matching them or looking binary are skipped.  Symbolic links to folders
+    are not followed.
+    '''
+    if excludes is None:
+        excludes = DEFAULT_EXCLUDES
+    endings = tuple('.' + suffix for suffix in suffixes)
+    # Each item is a folder and its path relative to the root.
+    folders = [(str(root), '')]
+    while folders:
+        folder, relative_folder = folders.pop()
+        with os.scandir(folder) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+        subfolders = []
+        for entry in entries:
+            relative_name = relative_folder + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if not excluded(relative_name, True, excludes):
+                    subfolders.append((entry.path, relative_name + '/'))
+            elif (entry.name.endswith(endings) and entry.is_file()
+                    and not excluded(relative_name, False, excludes)
+                    and not is_binary(entry.path)):
+                yield pathlib.Path(entry.path)
+        # Visit subfolders in order, since the last one is popped first.
+        folders.extend(reversed(subfolders))
+
+
+def load_mapping(path: str):
+    '''Load a dict of `old_word -> new_word` pairs from a mapping file.
+
+    Each line gives an old word and a new word separated by whitespaces.
+    Empty lines and lines starting with '#' are skipped.
+    '''
+    mapping = {}
+    with open(path) as mapping_file:
+        for line_number, line in enumerate(mapping_file, 1):
+            words = line.split()
+            if not words or words[0].startswith('#'):
+                continue
+            if len(words) != 2:
+                raise ValueError(f'{path}:{line_number}: expect two words')
+            mapping[words[0]] = words[1]
+    if not mapping:
+        raise ValueError(f'{path}: no pair found')
+    return mapping
+
+
+def compile_mapping(mapping: dict):
+    '''Compile the old words in a mapping into one regex.
+
+    Longer words are tried first, so that matches are leftmost-longest and
+    never overlap.
+    '''
+    old_words = sorted(mapping, key=len, reverse=True)
+    if isinstance(old_words[0], bytes):
+        return re.compile(b'|'.join(map(re.escape, old_words)))
+    return re.compile('|'.join(map(re.escape, old_words)))
+
+
+def trigrams(data: bytes):
+    '''Return the set of all 3-byte substrings of `data` as ints.
+    '''
+    # Zipping runs in C, and only distinct trigrams are converted.
+    return {a << 16 | b << 8 | c
+        for a, b, c in set(zip(data, data[1:], data[2:]))}
+
+
+def file_trigrams(path: pathlib.Path, block_size: int = 1 << 20):
+    '''Return the set of all trigrams in a file read in blocks.
+
+    Adjacent blocks overlap by 2 bytes, so no trigram is missed, and memory
+    does not grow with the size of the file.
+    '''
+    keys = set()
+    tail = b''
+    with path.open('rb') as old_file:
+        for block in iter(lambda: old_file.read(block_size), b''):
+            data = tail + block
+            keys.update(zip(data, data[1:], data[2:]))
+            tail = data[-2:]
+    return {a << 16 | b << 8 | c for a, b, c in keys}
+
+
+def _submit_now(function, *args):
+    # Call a function at once, and return its result as a future.
+    future = concurrent.futures.Future()
+    future.set_result(function(*args))
+    return future
+
+
+def _to_array(ids, typecode: str):
+    # Return a sequence of ids as an array, which is copied only if needed.
+    if isinstance(ids, array.array) and ids.typecode == typecode:
+        return ids
+    if isinstance(ids, memoryview) and ids.format == typecode:
+        an_array = array.array(typecode)
+        an_array.frombytes(ids.cast('B'))
+        return an_array
+    return array.array(typecode, ids)
+
+
+class TrigramIndex:
+    '''A persistent inverted index from trigrams to the files containing them.
+
+    The file consists of a header, the '\\0'-joined names of the files, the
+    mtimes and sizes of the files, the offsets of the posting lists, the
+    sorted trigrams and the posting lists of file ids.  The arrays are
+    memory-mapped, so a query only reads the posting lists of its trigrams.
+    '''
+
+    # magic, typecode of posting lists, numbers of files, bytes of names,
+    # trigrams and postings
+    HEADER = struct.Struct('=8s8sQQQQ')
+    MAGIC = b'trigram1'
+
+    def __init__(self, path: str):
+        self._path = path
+        self._names = []
+        self._mtimes = self._sizes = self._offsets = self._keys = []
+        self._postings = []
+        try:
+            self._load()
+        except (FileNotFoundError, TypeError, ValueError, struct.error):
+            # A missing or broken index is rebuilt from scratch.
+            self._names = []
+        self._ids = {name: i for i, name in enumerate(self._names)}
+        # _fresh[name] is (mtime, size, trigrams) of a new or changed file.
+        self._fresh = {}
+        self._seen = set()
+
+    def _load(self):
+        with open(self._path, 'rb') as index_file:
+            buffer = mmap.mmap(index_file.fileno(), 0,
+                access=mmap.ACCESS_READ)
+        magic, typecode, n_files, n_bytes, n_keys, n_postings = \
+            TrigramIndex.HEADER.unpack_from(buffer)
+        if magic != TrigramIndex.MAGIC:
+            raise ValueError(f'{self._path} is not a trigram index')
+        typecode = typecode.rstrip(b'\0').decode()
+        begin = TrigramIndex.HEADER.size
+        names = buffer[begin:begin + n_bytes]
+        begin += n_bytes + (-n_bytes % 8)
+        views = []
+        for length, code in ((n_files, 'q'), (n_files, 'q'),
+                (n_keys + 1, 'q'), (n_keys, 'I'), (n_postings, typecode)):
+            end = begin + length * array.array(code).itemsize
+            views.append(memoryview(buffer)[begin:end].cast(code))
+            begin = end
+        if begin != len(buffer):
+            raise ValueError(f'{self._path} has a wrong size')
+        self._names = [os.fsdecode(name) for name in names.split(b'\0')] \
+            if n_files else []
+        self._mtimes, self._sizes, self._offsets, self._keys, \
+            self._postings = views
+
+    def _posting_list(self, key: int):
+        i = bisect.bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            return ()
+        return self._posting_list_at(i)
+
+    def _posting_list_at(self, i: int):
+        return self._postings[self._offsets[i]:self._offsets[i + 1]]
+
+    def _indexed_ids(self, word: bytes):
+        # Return the ids of indexed files containing all trigrams of word.
+        ids = None
+        for key in trigrams(word):
+            posting_list = self._posting_list(key)
+            ids = set(posting_list) if ids is None else \
+                ids.intersection(posting_list)
+            if not ids:
+                break
+        return ids
+
+    def narrow(self, paths, old_words: list, jobs: int = 1):
+        '''Yield the paths of files which may contain any of `old_words`.
+
+        An indexed file is skipped without reading, if some trigram of each
+        old word is missing in it.  New files and files whose mtime or size
+        has changed are read and indexed again, by a pool of processes if
+        `jobs` > 1, while the paths are still yielded in order.  Words
+        shorter than 3 bytes match every file.
+        '''
+        words = [word.encode() for word in old_words]
+        if any(len(word) < 3 for word in words):
+            word_trigrams = None
+            ids = None
+        else:
+            word_trigrams = [trigrams(word) for word in words]
+            ids = set().union(*map(self._indexed_ids, words))
+        with contextlib.ExitStack() as stack:
+            submit = _submit_now
+            # Each item is a path, whether it may contain any word, and
+            # the future of its trigrams with its stat, if not indexed.
+            pending = collections.deque()
+            for path in paths:
+                name = str(path)
+                self._seen.add(name)
+                stat = path.stat()
+                i = self._ids.get(name)
+                if i is not None and (self._mtimes[i], self._sizes[i]) == \
+                        (stat.st_mtime_ns, stat.st_size):
+                    pending.append((path, ids is None or i in ids, None, None))
+                else:
+                    if jobs > 1 and submit is _submit_now:
+                        # Start the processes only if anything has changed.
+                        submit = stack.enter_context(
+                            concurrent.futures.ProcessPoolExecutor(jobs)
+                            ).submit
+                    future = submit(file_trigrams, path)
+                    pending.append((path, None, future, stat))
+                # Wait for the earliest file only if too many are pending.
+                while pending and (len(pending) > 16 * jobs
+                        or pending[0][2] is None or pending[0][2].done()):
+                    yield from self._narrowed(pending.popleft(),
+                        word_trigrams)
+            while pending:
+                yield from self._narrowed(pending.popleft(), word_trigrams)
+
+    def _narrowed(self, item, word_trigrams):
+        path, may_contain, future, stat = item
+        if future is not None:
+            trigram_set = future.result()
+            self._fresh[str(path)] = (stat.st_mtime_ns, stat.st_size,
+                trigram_set)
+            may_contain = word_trigrams is None or any(
+                keys <= trigram_set for keys in word_trigrams)
+        if may_contain:
+            yield path
+
+    def save(self):
+        '''Save the index atomically, if any file is new, changed or gone.
+
+        Call it after the paths given to `narrow` are exhausted.
+        '''
+        if not self._fresh and self._seen == set(self._names) and \
+                os.path.exists(self._path):
+            return
+        # Changed files keep their ids and new files are appended, so ids
+        # are only renumbered, if any file is gone.
+        kept = [i for i, name in enumerate(self._names) if name in self._seen]
+        stale = {self._ids[name] for name in self._fresh if name in self._ids}
+        new_ids = None
+        if len(kept) < len(self._names):
+            stale.update(set(range(len(self._names))).difference(kept))
+            new_ids = array.array('q', [-1]) * len(self._names)
+            for new_id, i in enumerate(kept):
+                new_ids[i] = new_id
+        names = [self._names[i] for i in kept]
+        mtimes = array.array('q', (self._mtimes[i] for i in kept))
+        sizes = array.array('q', (self._sizes[i] for i in kept))
+        ids = {name: i for i, name in enumerate(names)}
+        fresh_ids = []
+        for name, (mtime, size, trigram_set) in self._fresh.items():
+            i = ids.get(name)
+            if i is None:
+                i = len(names)
+                names.append(name)
+                mtimes.append(mtime)
+                sizes.append(size)
+            else:
+                mtimes[i] = mtime
+                sizes[i] = size
+            fresh_ids.append((i, trigram_set))
+        typecode = 'H' if len(names) <= 1 << 16 else 'I'
+        # Posting lists are sorted, and stay memory-mapped unless changed.
+        posting_lists = {}
+        for i, key in enumerate(self._keys):
+            posting_list = self._posting_list_at(i)
+            if new_ids is not None or len(stale) > 64:
+                posting_list = array.array(typecode, [
+                    j if new_ids is None else new_ids[j]
+                    for j in posting_list if j not in stale])
+            else:
+                for j in stale:
+                    p = bisect.bisect_left(posting_list, j)
+                    if p < len(posting_list) and posting_list[p] == j:
+                        posting_list = _to_array(posting_list, typecode)
+                        del posting_list[p]
+            if len(posting_list):
+                posting_lists[key] = posting_list
+        added = {}
+        for i, trigram_set in fresh_ids:
+            for key in trigram_set:
+                added.setdefault(key, []).append(i)
+        for key, ids_added in added.items():
+            ids_added.sort()
+            posting_list = _to_array(posting_lists.get(key, ()), typecode)
+            if not posting_list or posting_list[-1] < ids_added[0]:
+                posting_list.extend(ids_added)
+            else:
+                for i in ids_added:
+                    bisect.insort(posting_list, i)
+            posting_lists[key] = posting_list
+        self._write(names, mtimes, sizes, posting_lists, typecode)
+
+    def _write(self, names, mtimes, sizes, posting_lists, typecode):
+        keys = array.array('I', sorted(posting_lists))
+        offsets = array.array('q', [0])
+        postings = array.array(typecode)
+        for key in keys:
+            postings.extend(_to_array(posting_lists[key], typecode))
+            offsets.append(len(postings))
+        names = b'\0'.join(map(os.fsencode, names))
+        directory = os.path.dirname(os.path.abspath(self._path))
+        with tempfile.NamedTemporaryFile('wb', dir=directory, suffix='.temp',
+                delete=False) as index_file:
+            index_file.write(TrigramIndex.HEADER.pack(TrigramIndex.MAGIC,
+                typecode.encode(), len(mtimes), len(names), len(keys),
+                len(postings)))
+            index_file.write(names)
+            index_file.write(bytes(-len(names) % 8))
+            for an_array in (mtimes, sizes, offsets, keys, postings):
+                an_array.tofile(index_file)
+        # A temporary file is only readable by its owner.
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(index_file.name, 0o666 & ~umask)
+        os.replace(index_file.name, self._path)
+
+
+def count_word(path: pathlib.Path, old_word):
+    '''Count a word in a file, and return the name of the file and the count.
+
+    The `old_word` can also be a compiled regex, whose matches are counted.
+    '''
+    if isinstance(old_word, str):
+        def count_in_line(line):
+            return line.count(old_word)
+    else:
+        def count_in_line(line):
+            return len(old_word.findall(line))
+    word_count_in_file = 0
+    with path.open() as old_file:
+        for line in old_file:
+            word_count_in_file += count_in_line(line)
+    return str(path), word_count_in_file
+
+
+@contextlib.contextmanager
+def mapped(path: pathlib.Path):
+    '''Map a file into memory read-only, so it is paged in on demand.
+    '''
+    with path.open('rb') as old_file:
+        if os.fstat(old_file.fileno()).st_size == 0:
+            # An empty file cannot be mapped.
+            yield b''
+            return
+        with mmap.mmap(old_file.fileno(), 0,
+                access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+
+
+def find_all(buffer, old_word):
+    '''Yield the (start, end) of each non-overlapping match in `buffer`.
+
+    The `old_word` is either bytes or a compiled bytes regex.
+    '''
+    if isinstance(old_word, bytes):
+        assert old_word, 'Cannot find an empty word.'
+        start = buffer.find(old_word)
+        while start >= 0:
+            end = start + len(old_word)
+            yield start, end
+            start = buffer.find(old_word, end)
+    else:
+        for match in old_word.finditer(buffer):
+            yield match.span()
+
+
+def count_bytes(path: pathlib.Path, old_word):
+    '''Count a word given in bytes in a memory-mapped file.
+
+    Unlike `count_word`, memory does not grow with the length of lines, and
+    nothing is decoded.  The `old_word` can also be a compiled bytes regex.
+    '''
+    with mapped(path) as buffer:
+        word_count_in_file = sum(1 for _ in find_all(buffer, old_word))
+    return str(path), word_count_in_file
+
+
+def scan_and_print(paths, suffix: str, old_word, jobs: int = 1,
+        matched: list = None, count=count_word, label: str = None):
+    '''Scan a word in all files with a given iterable of paths.
+
+    If `jobs` > 1, the files are scanned by a pool of processes, which start
+    before `paths` is exhausted, while the counts are printed in order.
+    The paths of files containing the word are appended to `matched`.
+    Each file is scanned by `count`, which is `count_word` or `count_bytes`.
+    The counts are printed with `label`, e.g. 'word(s) of renames.txt' for
+    a compiled mapping, or with the quoted word or pattern by default.
     '''
+    if label is None:
+        label = old_word
+        if not isinstance(label, (str, bytes)):
+            label = label.pattern
+        if isinstance(label, bytes):
+            label = label.decode(errors='replace')
+        label = f'"{label}"(s)'
+    if jobs > 1:
+        with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+            counts = executor.map(count, paths,
+                itertools.repeat(old_word), chunksize=16)
+            return _print_counts(counts, suffix, label, matched)
+    return _print_counts(map(count, paths, itertools.repeat(old_word)),
+        suffix, label, matched)
+
+
+def _print_counts(counts, suffix: str, label: str, matched: list):
     word_count = 0
     file_count = 0
-    for path in paths:
-        old_name = str(path)
-        word_count_in_file = 0
-        with path.open() as old_file:
-            for line in old_file:
-                word_count_in_line = line.count(old_word)
-                if word_count_in_line > 0:
-                    word_count_in_file += word_count_in_line
+    for old_name, word_count_in_file in counts:
         if word_count_in_file > 0:
-            print(f'{word_count_in_file} "{old_word}"(s) found in {old_name}')
+            print(f'{word_count_in_file} {label} found in {old_name}')
             word_count += word_count_in_file
             file_count += 1
-    print(f'{word_count} "{old_word}"(s) found in {file_count} {suffix}',
-        'file(s)')
+            if matched is not None:
+                matched.append(pathlib.Path(old_name))
+    print(f'{word_count} {label} found in {file_count} {suffix} file(s)')
     return word_count
 
 
-def scan_and_delete(paths: list, old_word: str):
+def rewrite(path: pathlib.Path, rewrite_line):
+    '''Rewrite each line of a file by `rewrite_line` in one buffered pass.
+
+    The new lines are written into a temporary file in the same folder, which
+    atomically replaces the old file only if any line has been changed.
+    Return whether the file has been changed.
+    '''
+    changed = False
+    new_file = tempfile.NamedTemporaryFile('w', dir=path.parent,
+        prefix=path.name, suffix='.temp', delete=False)
+    try:
+        with new_file, path.open() as old_file:
+            for line in old_file:
+                new_line = rewrite_line(line)
+                changed = changed or new_line != line
+                new_file.write(new_line)
+        if changed:
+            shutil.copymode(path, new_file.name)
+            os.replace(new_file.name, path)
+    finally:
+        if not changed:
+            os.remove(new_file.name)
+    return changed
+
+
+def rewrite_bytes(path: pathlib.Path, old_word, new_word):
+    '''Replace each match of `old_word` by `new_word` in a memory-mapped file.
+
+    The `old_word` is either bytes or a compiled bytes regex, and `new_word`
+    is either bytes or a dict mapping each matched bytes to its replacement.
+    The file is copied in blocks of bounded size, and replaced atomically
+    only if anything has been matched.  Return whether it has been changed.
+    '''
+    changed = False
+    new_file = tempfile.NamedTemporaryFile('wb', dir=path.parent,
+        prefix=path.name, suffix='.temp', delete=False)
+    try:
+        with new_file, mapped(path) as buffer:
+            copied = 0
+            for start, end in find_all(buffer, old_word):
+                _copy(buffer, copied, start, new_file)
+                if isinstance(new_word, bytes):
+                    new_file.write(new_word)
+                else:
+                    new_file.write(new_word[buffer[start:end]])
+                copied = end
+                changed = True
+            _copy(buffer, copied, len(buffer), new_file)
+        if changed:
+            shutil.copymode(path, new_file.name)
+            os.replace(new_file.name, path)
+    finally:
+        if not changed:
+            os.remove(new_file.name)
+    return changed
+
+
+def _copy(buffer, start: int, end: int, new_file, block_size: int = 1 << 20):
+    for block_start in range(start, end, block_size):
+        new_file.write(buffer[block_start:min(block_start + block_size, end)])
+
+
+def scan_and_delete(paths: list, old_word):
     '''Scan a word in all files in a given list of paths and delete the lines.
+
+    The `old_word` can also be a compiled regex, whose matching lines are
+    deleted.  Only the files containing the word are written.
     '''
+    if isinstance(old_word, str):
+        def found(line):
+            return old_word in line
+    else:
+        found = old_word.search
     for path in paths:
-        old_name = str(path)
-        new_name = old_name + '.temp'
-        with path.open() as old_file:
-            with open(new_name, 'w') as new_file:
-                for line in old_file:
-                    if old_word not in line:
-                        new_file.write(line)
-        pathlib.Path(new_name).replace(old_name)
+        rewrite(path, lambda line: '' if found(line) else line)
 
 
 def scan_and_replace(paths: list, old_word: str, new_word: str):
     '''Scan a word in all files in a given list of paths and replace the words.
+
+    Only the files containing the word are written.
     '''
     for path in paths:
-        old_name = str(path)
-        new_name = old_name + '.temp'
-        with path.open() as old_file:
-            with open(new_name, 'w') as new_file:
-                for line in old_file:
-                    new_file.write(line.replace(old_word, new_word))
-        pathlib.Path(new_name).replace(old_name)
+        rewrite(path, lambda line: line.replace(old_word, new_word))
+
+
+def scan_and_replace_mapping(paths: list, mapping: dict):
+    '''Replace the old words in a mapping by the new ones in one pass.
+
+    Only the files containing any old word are written.
+    '''
+    pattern = compile_mapping(mapping)
+    def new_word(match):
+        return mapping[match.group()]
+    for path in paths:
+        rewrite(path, lambda line: pattern.sub(new_word, line))
+
+
+def scan_and_replace_bytes(paths: list, old_word, new_word):
+    '''Replace a word, or the old words in a mapping, in memory-mapped files.
+
+    The arguments are those of `rewrite_bytes`, e.g. a compiled mapping and
+    the mapping itself.  Only the files containing any old word are written.
+    '''
+    for path in paths:
+        rewrite_bytes(path, old_word, new_word)
 
 
 if __name__ == '__main__':
@@ -62,8 +593,14 @@ if __name__ == '__main__':
         default='.', type=str,
         help='path of the folder to be scanned')
     parser.add_argument('-s', '--suffix',
-        default='py', type=str,
-        help='suffix (type) of files to be scanned')
+        default=['py'], type=str, nargs='+',
+        help='suffixes (types) of files to be scanned')
+    parser.add_argument('-x', '--exclude',
+        default=None, type=str, action='append',
+        help='.gitignore-style pattern of paths to be skipped (repeatable)')
+    parser.add_argument('-a', '--all',
+        action='store_true',
+        help='also scan ' + ', '.join(DEFAULT_EXCLUDES))
     parser.add_argument('-o', '--old_word',
         default='hello', type=str,
         help='the old string to be searched')
@@ -76,18 +613,71 @@ if __name__ == '__main__':
     parser.add_argument('-r', '--replace',
         action='store_true',
         help='replace the old string with the new one')
+    parser.add_argument('-m', '--mapping',
+        default=None, type=str,
+        help='file of "old_word new_word" lines replacing -o and -n')
+    parser.add_argument('-i', '--index',
+        default=None, type=str,
+        help='trigram index file narrowing the files to be scanned')
+    parser.add_argument('-b', '--bytes',
+        action='store_true',
+        help='scan and replace memory-mapped bytes, for huge or newline-free'
+            ' files (deleting is still line by line)')
+    parser.add_argument('-j', '--jobs',
+        default=1, type=int,
+        help='number of processes scanning files in parallel')
     args = parser.parse_args()
     print(args)
     root = pathlib.Path(args.path)
-    paths = list(root.glob('**/*.' + args.suffix))
-    if scan_and_print(paths, args.suffix, args.old_word) > 0:
+    old_word = args.old_word
+    old_words = [old_word]
+    if args.mapping:
+        mapping = load_mapping(args.mapping)
+        old_word = compile_mapping(mapping)
+        old_words = list(mapping)
+    count, scanned_word = count_word, old_word
+    if args.bytes:
+        count, scanned_word = count_bytes, args.old_word.encode()
+        if args.mapping:
+            mapping_in_bytes = {old.encode(): new.encode()
+                for old, new in mapping.items()}
+            scanned_word = compile_mapping(mapping_in_bytes)
+    excludes = args.exclude or []
+    if not args.all:
+        excludes = DEFAULT_EXCLUDES + excludes
+    candidates = walk(root, args.suffix, excludes)
+    if args.index:
+        index = TrigramIndex(args.index)
+        candidates = index.narrow(candidates, old_words, args.jobs)
+    # Only the files containing the old word are read again and rewritten.
+    paths = []
+    label = f'word(s) of {args.mapping}' if args.mapping else None
+    word_count = scan_and_print(candidates, '/'.join(args.suffix),
+        scanned_word, args.jobs, paths, count, label)
+    if args.index:
+        # Files to be rewritten get new entries on the next run.
+        index.save()
+    if word_count > 0:
         if args.delete:
             print('Are you sure to delete these lines? [y/n]',
                 end='', flush=True)
             if sys.stdin.read(1) == 'y':
-                scan_and_delete(paths, args.old_word)
+                scan_and_delete(paths, old_word)
+        elif args.replace and args.mapping:
+            print(f'Are you sure to replace these words by {args.mapping}?',
+                '[y/n]', end='', flush=True)
+            if sys.stdin.read(1) == 'y':
+                if args.bytes:
+                    scan_and_replace_bytes(paths, scanned_word,
+                        mapping_in_bytes)
+                else:
+                    scan_and_replace_mapping(paths, mapping)
         elif args.replace:
             print(f'Are you sure to replace these "{args.old_word}"s',
                 f'to "{args.new_word}"s? [y/n]', end='', flush=True)
             if sys.stdin.read(1) == 'y':
-                scan_and_replace(paths, args.old_word, args.new_word)
+                if args.bytes:
+                    scan_and_replace_bytes(paths, scanned_word,
+                        args.new_word.encode())
+                else:
+                    scan_and_replace(paths, args.old_word, args.new_word)
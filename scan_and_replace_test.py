@@ -0,0 +1,317 @@
+'''Test functions defined in scan_and_replace.py.
+'''
+
+import contextlib
+import io
+import os
+import pathlib
+import random
+import re
+import tempfile
+import unittest
+
+from scan_and_replace import TrigramIndex
+from scan_and_replace import compile_mapping
+from scan_and_replace import count_bytes
+from scan_and_replace import count_word
+from scan_and_replace import excluded
+from scan_and_replace import file_trigrams
+from scan_and_replace import find_all
+from scan_and_replace import load_mapping
+from scan_and_replace import rewrite
+from scan_and_replace import rewrite_bytes
+from scan_and_replace import scan_and_delete
+from scan_and_replace import scan_and_print
+from scan_and_replace import scan_and_replace
+from scan_and_replace import scan_and_replace_bytes
+from scan_and_replace import scan_and_replace_mapping
+from scan_and_replace import trigrams
+from scan_and_replace import walk
+
+
+class TestScanAndReplace(unittest.TestCase):
+    '''Test the correctness of scan_and_replace.py.
+    '''
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._root = pathlib.Path(self._directory.name)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _write(self, name: str, content):
+        path = self._root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            path.write_text(content)
+        return path
+
+    def test_excluded(self):
+        '''Test matching .gitignore-style patterns.
+        '''
+        # A pattern ending with '/' only matches folders.
+        self.assertTrue(excluded('src/build', True, ['build/']))
+        self.assertFalse(excluded('src/build', False, ['build/']))
+        # A pattern without '/' matches the last part at any depth.
+        self.assertTrue(excluded('a/b/c.txt', False, ['*.txt']))
+        self.assertFalse(excluded('a/b/c.txt', False, ['b']))
+        # A pattern containing '/' matches the whole relative path.
+        self.assertTrue(excluded('src/gen', True, ['src/gen/']))
+        self.assertTrue(excluded('src/gen', True, ['/src/gen']))
+        self.assertFalse(excluded('lib/src/gen', True, ['src/gen/']))
+        self.assertFalse(excluded('a.py', False, []))
+
+    def test_walk(self):
+        '''Test pruning folders, and skipping binary and other files.
+        '''
+        for name in ('a.py', 'b.txt', 'c.md', 'src/d.py', 'src/gen/e.py',
+                '.git/f.py', 'node_modules/g.py'):
+            self._write(name, 'hello\n')
+        self._write('src/binary.py', b'hello\0world')
+        def walked(suffixes, excludes=None):
+            return sorted(path.relative_to(self._root).as_posix()
+                for path in walk(self._root, suffixes, excludes))
+        self.assertEqual(walked(['py']), ['a.py', 'src/d.py', 'src/gen/e.py'])
+        # Given patterns replace the default ones.
+        self.assertEqual(walked(['py', 'txt'], ['src/', '.*/', 'node_*/']),
+            ['a.py', 'b.txt'])
+        self.assertEqual(walked(['py'], ['src/gen/', '.git/']),
+            ['a.py', 'node_modules/g.py', 'src/d.py'])
+
+    def test_compile_mapping(self):
+        '''Test that matches are leftmost-longest and non-overlapping.
+        '''
+        mapping = {'foo': 'X', 'foobar': 'Y', 'bar': 'foo'}
+        pattern = compile_mapping(mapping)
+        new_line = pattern.sub(lambda match: mapping[match.group()],
+            'foo foobar barfoo')
+        self.assertEqual(new_line, 'X Y fooX')
+        mapping_in_bytes = {b'ab': b'1', b'abc': b'2'}
+        pattern = compile_mapping(mapping_in_bytes)
+        self.assertEqual([match.group() for match in
+            pattern.finditer(b'abcab')], [b'abc', b'ab'])
+
+    def test_load_mapping(self):
+        '''Test loading pairs, and rejecting malformed mapping files.
+        '''
+        path = self._write('mapping.txt',
+            '# old new\n\nfoo bar\n  foobar   baz  \n')
+        self.assertEqual(load_mapping(path), {'foo': 'bar', 'foobar': 'baz'})
+        for content in ('foo bar\nbaz\n', 'foo bar baz\n', '# foo bar\n', ''):
+            path = self._write('mapping.txt', content)
+            with self.assertRaises(ValueError):
+                load_mapping(path)
+
+    def test_scan_and_replace_mapping(self):
+        '''Test replacing by a mapping in one pass, and printing its name.
+        '''
+        a = self._write('a.py', 'foo foobar bar\n')
+        b = self._write('b.py', 'baz\n')
+        os.utime(b, ns=(0, 0))
+        mapping = {'foo': 'bar', 'foobar': 'foo', 'bar': 'foo'}
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            word_count = scan_and_print([a, b], 'py',
+                compile_mapping(mapping), label='word(s) of mapping.txt')
+        self.assertEqual(word_count, 3)
+        self.assertEqual(output.getvalue().splitlines()[-1],
+            '3 word(s) of mapping.txt found in 1 py file(s)')
+        # A new word is never replaced again.
+        scan_and_replace_mapping([a, b], mapping)
+        self.assertEqual(a.read_text(), 'bar foo foo\n')
+        self.assertEqual(b.stat().st_mtime_ns, 0)
+
+    def test_find_all(self):
+        '''Test that counts of matches are those of str.count().
+        '''
+        for text, word in (('aaaaa', 'aa'), ('abababa', 'aba'),
+                ('hello world', 'o'), ('', 'x'), ('xyz', 'xyz')):
+            path = self._write('a.txt', text)
+            self.assertEqual(sum(1 for _ in
+                find_all(text.encode(), word.encode())), text.count(word))
+            self.assertEqual(count_bytes(path, word.encode())[1],
+                text.count(word))
+            self.assertEqual(count_word(path, word)[1], text.count(word))
+
+    def test_scan_in_parallel(self):
+        '''Test that scanning by processes prints as scanning serially.
+        '''
+        for i in range(50):
+            self._write(f'src/{i % 7}/{i}.py', 'hello world\n' * (i % 4))
+        def scanned(jobs, count):
+            output = io.StringIO()
+            matched = []
+            with contextlib.redirect_stdout(output):
+                word_count = scan_and_print(walk(self._root, ['py']), 'py',
+                    b'hello' if count is count_bytes else 'hello', jobs,
+                    matched, count)
+            return word_count, matched, output.getvalue()
+        for count in (count_word, count_bytes):
+            serial = scanned(1, count)
+            self.assertEqual(serial[0], sum(i % 4 for i in range(50)))
+            self.assertEqual(len(serial[1]), 37)
+            self.assertEqual(scanned(2, count), serial)
+
+    def test_rewrite(self):
+        '''Test rewriting only matched files and keeping their mode.
+        '''
+        matched = self._write('matched.py', 'hello\nworld\n')
+        unmatched = self._write('unmatched.py', 'world\n')
+        os.chmod(matched, 0o751)
+        os.utime(unmatched, ns=(0, 0))
+        def replace(line):
+            return line.replace('hello', 'bye')
+        self.assertTrue(rewrite(matched, replace))
+        self.assertFalse(rewrite(unmatched, replace))
+        self.assertEqual(matched.read_text(), 'bye\nworld\n')
+        self.assertEqual(matched.stat().st_mode & 0o777, 0o751)
+        self.assertEqual(unmatched.stat().st_mtime_ns, 0)
+        # No temporary file is left.
+        self.assertEqual(sorted(path.name for path in self._root.iterdir()),
+            ['matched.py', 'unmatched.py'])
+
+    def test_scan_and_delete(self):
+        '''Test deleting the lines containing a word or a regex.
+        '''
+        a = self._write('a.py', 'hello\nworld\nhello world\n')
+        b = self._write('b.py', 'world\n')
+        os.utime(b, ns=(0, 0))
+        scan_and_delete([a, b], 'hello')
+        self.assertEqual(a.read_text(), 'world\n')
+        self.assertEqual(b.stat().st_mtime_ns, 0)
+        scan_and_delete([a, b], re.compile('^w'))
+        self.assertEqual(a.read_text(), '')
+        self.assertEqual(b.read_text(), '')
+
+    def test_scan_and_replace(self):
+        '''Test replacing a word in matched files only.
+        '''
+        a = self._write('a.py', 'hello\nhello hello\n')
+        b = self._write('b.py', 'world\n')
+        os.utime(b, ns=(0, 0))
+        scan_and_replace([a, b], 'hello', 'bye')
+        self.assertEqual(a.read_text(), 'bye\nbye bye\n')
+        self.assertEqual(b.stat().st_mtime_ns, 0)
+        self.assertEqual(sorted(path.name for path in self._root.iterdir()),
+            ['a.py', 'b.py'])
+
+    def test_rewrite_bytes(self):
+        '''Test rewriting matched bytes only and keeping the mode.
+        '''
+        matched = self._write('matched.py', b'foo foobar\n' * 3)
+        unmatched = self._write('unmatched.py', b'bar\n')
+        empty = self._write('empty.py', b'')
+        os.chmod(matched, 0o751)
+        os.utime(unmatched, ns=(0, 0))
+        self.assertTrue(rewrite_bytes(matched, b'foo', b'X'))
+        self.assertFalse(rewrite_bytes(unmatched, b'foo', b'X'))
+        self.assertFalse(rewrite_bytes(empty, b'foo', b'X'))
+        self.assertEqual(matched.read_bytes(), b'X Xbar\n' * 3)
+        self.assertEqual(matched.stat().st_mode & 0o777, 0o751)
+        self.assertEqual(unmatched.stat().st_mtime_ns, 0)
+        # Replace by a mapping.
+        mapping = {b'X': b'foo', b'Xbar': b'Y'}
+        self.assertTrue(rewrite_bytes(matched, compile_mapping(mapping),
+            mapping))
+        self.assertEqual(matched.read_bytes(), b'foo Y\n' * 3)
+        self.assertEqual(sorted(path.name for path in self._root.iterdir()),
+            ['empty.py', 'matched.py', 'unmatched.py'])
+
+    def test_scan_and_replace_bytes(self):
+        '''Test a newline-free file larger than a block of copying.
+        '''
+        data = b'x' * 2_500_000 + b'hello'
+        a = self._write('a.py', data * 3)
+        b = self._write('b.py', b'world')
+        os.utime(b, ns=(0, 0))
+        self.assertEqual(count_bytes(a, b'hello'), (str(a), 3))
+        scan_and_replace_bytes([a, b], b'hello', b'bye')
+        self.assertEqual(a.read_bytes(), (b'x' * 2_500_000 + b'bye') * 3)
+        self.assertEqual(b.stat().st_mtime_ns, 0)
+
+    def test_trigram_index(self):
+        '''Test narrowing files by an index, which is updated on changes.
+        '''
+        a = self._write('src/a.py', 'def hello():\n')
+        self._write('src/b.py', 'def world():\n')
+        index_path = str(self._root / 'index.bin')
+        def narrowed(old_words):
+            index = TrigramIndex(index_path)
+            paths = index.narrow(walk(self._root / 'src', ['py']), old_words)
+            names = sorted(path.name for path in paths)
+            index.save()
+            return names
+        self.assertEqual(narrowed(['hello']), ['a.py'])
+        self.assertEqual(narrowed(['hello', 'world']), ['a.py', 'b.py'])
+        self.assertEqual(narrowed(['nothing']), [])
+        # Short words cannot be narrowed.
+        self.assertEqual(narrowed(['he']), ['a.py', 'b.py'])
+        # Changed, new and removed files are indexed again.
+        a.write_text('def nothing():\n')
+        self._write('src/c.py', 'hello\n')
+        os.remove(self._root / 'src' / 'b.py')
+        self.assertEqual(narrowed(['hello']), ['c.py'])
+        self.assertEqual(narrowed(['nothing']), ['a.py'])
+        self.assertEqual(narrowed(['def']), ['a.py'])
+        self.assertEqual(os.stat(index_path).st_mode & 0o777,
+            0o666 & ~_umask())
+
+    def test_file_trigrams(self):
+        '''Test that reading in blocks misses no trigram across them.
+        '''
+        a_random = random.Random(0)
+        data = bytes(a_random.randrange(256) for _ in range(1000))
+        path = self._write('a.bin', data)
+        self.assertEqual(trigrams(b'abcab'), {0x616263, 0x626361, 0x636162})
+        for block_size in (1, 2, 3, 7, 1 << 20):
+            self.assertEqual(file_trigrams(path, block_size), trigrams(data))
+        self.assertEqual(file_trigrams(self._write('b.bin', b'ab')), set())
+
+    def test_updating_trigram_index(self):
+        '''Test that an updated index narrows as one built from scratch.
+        '''
+        a_random = random.Random(0)
+        words = ['alpha', 'beta', 'gamma', 'delta', 'epsilon']
+        n_writes = [0]
+        def write_randomly(name):
+            path = self._write(f'src/{name}.py', ' '.join(
+                a_random.sample(words, a_random.randrange(3))))
+            # Make each write visible even if the size is unchanged.
+            n_writes[0] += 1
+            os.utime(path, ns=(n_writes[0], n_writes[0]))
+        def narrowed(index_path, jobs):
+            index = TrigramIndex(str(self._root / index_path))
+            paths = walk(self._root / 'src', ['py'])
+            names = [[path.name for path in index.narrow(paths, [word],
+                jobs)] for word in words]
+            index.save()
+            return names
+        for i in range(20):
+            write_randomly(i)
+        for jobs in (1, 2):
+            for _ in range(5):
+                for i in a_random.sample(range(30), 5):
+                    write_randomly(i)
+                for i in a_random.sample(range(30), 2):
+                    path = self._root / 'src' / f'{i}.py'
+                    if path.exists():
+                        os.remove(path)
+                updated = narrowed(f'updated{jobs}.bin', jobs)
+                os.remove(self._root / f'updated{jobs}.bin')
+                rebuilt = narrowed(f'updated{jobs}.bin', jobs)
+                self.assertEqual(updated, rebuilt)
+                # Unchanged files are narrowed by the index.
+                self.assertEqual(narrowed(f'updated{jobs}.bin', 1), rebuilt)
+
+
+def _umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""Benchmark classes defined in graph.py and scheduler.py."""
+
+import json
+import random
+import time
+import tracemalloc
+
+from graph import CompactUnionFind
+from graph import DirectedGraph
+from graph import Reachability
+from graph import TopologicalSort
+from graph import UnionFind
+from scheduler import Scheduler
+
+
+def chain(n_vertices):
+    """Return the edges of a linked list n-1 -> ... -> 1 -> 0."""
+    return [(i, i - 1) for i in range(1, n_vertices)]
+
+
+def fan(n_vertices):
+    """Return the edges of a vertex connected to all the others."""
+    return [(0, i) for i in range(1, n_vertices)]
+
+
+def random_dag(n_vertices, n_edges_per_vertex=4, seed=0):
+    """Return the edges of a random DAG, whose edges go to lower vertices."""
+    a_random = random.Random(seed)
+    edges = list()
+    for j in range(1, n_vertices):
+        for _ in range(n_edges_per_vertex):
+            edges.append((j, a_random.randrange(j)))
+    return edges
+
+
+def forest(n_vertices, n_trees=100, seed=0):
+    """Return the edges of random trees with vertices dealt round-robin."""
+    a_random = random.Random(seed)
+    edges = list()
+    for j in range(n_trees, n_vertices):
+        # The parent of vertex[j] is in the same tree, i.e. equal modulo.
+        parent = j - n_trees * (1 + a_random.randrange(j // n_trees))
+        edges.append((j, parent))
+    return edges
+
+
+GENERATORS = {
+    'chain': chain,
+    'fan': fan,
+    'random_dag': random_dag,
+    'forest': forest,
+}
+
+
+def _build_graph(edges):
+    a_graph = DirectedGraph()
+    for j, k in edges:
+        a_graph.connect(j, k)
+    return a_graph
+
+
+def _build_union(edges, union_class=UnionFind):
+    a_union = union_class()
+    for j, k in edges:
+        a_union.connect(j, k)
+    return a_union
+
+
+def _find_roots(a_union):
+    for i in range(a_union.n_vertices()):
+        a_union.root(i)
+
+
+def _check_paths(a_graph, n_queries=100, seed=0):
+    a_random = random.Random(seed)
+    checker = Reachability(a_graph)
+    n_vertices = a_graph.n_vertices()
+    for _ in range(n_queries):
+        checker.has_path(a_random.randrange(n_vertices),
+                         a_random.randrange(n_vertices))
+
+
+def _build_scheduler(edges):
+    a_scheduler = Scheduler()
+    a_scheduler.add_edges(edges)
+    return a_scheduler
+
+
+def _cases(edges):
+    # Yield (name, setup, run) for each case, where run(setup()) is measured.
+    yield ('DirectedGraph.connect', lambda: edges, _build_graph)
+    yield ('UnionFind.connect', lambda: edges, _build_union)
+    yield ('UnionFind.root', lambda: _build_union(edges), _find_roots)
+    yield ('UnionFind.roots', lambda: _build_union(edges),
+           lambda a_union: a_union.roots())
+    yield ('CompactUnionFind.connect', lambda: edges,
+           lambda edges: _build_union(edges, CompactUnionFind))
+    yield ('TopologicalSort.sort', lambda: _build_graph(edges),
+           lambda a_graph: TopologicalSort(a_graph).sort())
+    yield ('Reachability.has_path', lambda: _build_graph(edges), _check_paths)
+    yield ('Scheduler.schedule', lambda: _build_scheduler(edges),
+           lambda a_scheduler: a_scheduler.schedule())
+
+
+def _measure(setup, run):
+    # Time a run without tracing, then trace another run for peak memory.
+    argument = setup()
+    start = time.perf_counter()
+    run(argument)
+    seconds = time.perf_counter() - start
+    argument = setup()
+    tracemalloc.start()
+    try:
+        run(argument)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': seconds, 'peak_bytes': peak_bytes}
+
+
+def run_benchmarks(sizes, generators=None):
+    """Return a dict mapping 'generator/size/case' to its measurements."""
+    if generators is None:
+        generators = sorted(GENERATORS)
+    results = dict()
+    for name in generators:
+        for size in sizes:
+            edges = GENERATORS[name](size)
+            for case, setup, run in _cases(edges):
+                key = '{0}/{1}/{2}'.format(name, size, case)
+                results[key] = _measure(setup, run)
+    return results
+
+
+# Differences below these are regarded as noise.
+NOISE = {'seconds': 1e-3, 'peak_bytes': 1024}
+
+
+def find_regressions(results, baseline, threshold=1.5):
+    """Return the keys of measurements exceeding threshold times baseline."""
+    regressions = list()
+    for key, measurements in sorted(results.items()):
+        if key not in baseline:
+            continue
+        for metric, value in sorted(measurements.items()):
+            expected = baseline[key].get(metric, value)
+            if value > threshold * expected + NOISE.get(metric, 0):
+                regressions.append('{0}:{1}'.format(key, metric))
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    PARSER = argparse.ArgumentParser(
+        description='Benchmark graph.py and scheduler.py.')
+    PARSER.add_argument('-n', '--sizes', type=int, nargs='+',
+                        default=[1000, 10000, 100000],
+                        help='numbers of vertices')
+    PARSER.add_argument('-g', '--generators', nargs='+',
+                        choices=sorted(GENERATORS),
+                        help='generators of graphs')
+    PARSER.add_argument('-b', '--baseline', metavar='JSON',
+                        help='compare with a baseline')
+    PARSER.add_argument('-s', '--save', metavar='JSON',
+                        help='save results as a baseline')
+    PARSER.add_argument('-t', '--threshold', type=float, default=1.5,
+                        help='ratio to the baseline regarded as a regression')
+    ARGS = PARSER.parse_args()
+    RESULTS = run_benchmarks(ARGS.sizes, ARGS.generators)
+    for KEY, MEASUREMENTS in sorted(RESULTS.items()):
+        print('{0:<50} {1:>10.4f} s {2:>12} B'.format(
+            KEY, MEASUREMENTS['seconds'], MEASUREMENTS['peak_bytes']))
+    if ARGS.save:
+        with open(ARGS.save, 'w') as FILE:
+            json.dump(RESULTS, FILE, indent=2, sort_keys=True)
+    if ARGS.baseline:
+        with open(ARGS.baseline) as FILE:
+            REGRESSIONS = find_regressions(RESULTS, json.load(FILE),
+                                           ARGS.threshold)
+        for REGRESSION in REGRESSIONS:
+            print('Regression: ' + REGRESSION)
+        if REGRESSIONS:
+            sys.exit(1)
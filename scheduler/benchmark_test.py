@@ -0,0 +1,57 @@
+"""Test functions defined in benchmark.py."""
+
+import unittest
+
+from benchmark import GENERATORS
+from benchmark import find_regressions
+from benchmark import run_benchmarks
+from graph import DirectedGraph
+from graph import TopologicalSort
+from graph import UnionFind
+
+
+class TestBenchmark(unittest.TestCase):
+    """Test the correctness of benchmark.py."""
+
+    def test_generators(self):
+        """Test that generators give DAGs of the given size."""
+        for generate in GENERATORS.values():
+            edges = generate(1000)
+            a_graph = DirectedGraph()
+            for j, k in edges:
+                a_graph.connect(j, k)
+            self.assertEqual(a_graph.n_vertices(), 1000)
+            self.assertEqual(len(TopologicalSort(a_graph).sort()), 1000)
+
+    def test_forest(self):
+        """Test that a forest consists of the given number of trees."""
+        a_union = UnionFind()
+        for j, k in GENERATORS['forest'](1000, n_trees=10):
+            a_union.connect(j, k)
+        roots = {a_union.root(i) for i in range(1000)}
+        self.assertEqual(len(roots), 10)
+
+    def test_run_benchmarks(self):
+        """Test running benchmarks on small graphs."""
+        results = run_benchmarks([10, 20], ['chain', 'fan'])
+        self.assertEqual(len(results), 2 * 2 * 8)
+        for measurements in results.values():
+            self.assertTrue(measurements['seconds'] >= 0)
+            self.assertTrue(measurements['peak_bytes'] >= 0)
+
+    def test_find_regressions(self):
+        """Test comparing results with a baseline."""
+        baseline = {'a': {'seconds': 1.0, 'peak_bytes': 10**6},
+                    'b': {'seconds': 1.0, 'peak_bytes': 10**6},
+                    'd': {'seconds': 1e-4, 'peak_bytes': 10}}
+        results = {'a': {'seconds': 1.2, 'peak_bytes': 3 * 10**6},
+                   'b': {'seconds': 2.0, 'peak_bytes': 10**6},
+                   'c': {'seconds': 9.0, 'peak_bytes': 9 * 10**6},
+                   'd': {'seconds': 5e-4, 'peak_bytes': 50}}
+        self.assertEqual(find_regressions(results, baseline),
+                         ['a:peak_bytes', 'b:seconds'])
+        self.assertEqual(find_regressions(results, baseline, 4.0), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
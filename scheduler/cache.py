@@ -0,0 +1,97 @@
+"""Define a persistent cache for results of tasks."""
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+
+class BuildCache:
+    """A size-bounded on-disk cache of picklable results.
+
+    Each result is pickled into a file named by its key.  Once the total
+    size exceeds max_bytes, the least recently used files are evicted.
+    """
+
+    def __init__(self, directory, max_bytes=1 << 30):
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._n_bytes = sum(entry.stat().st_size
+                            for entry in os.scandir(directory)
+                            if entry.is_file())
+        # _digests[path] is (mtime, size, digest) of the file at path, so
+        # an unchanged file is not hashed again.
+        self._digests = dict()
+
+    def key(self, task, input_paths, prerequisite_keys):
+        """Return the key of a task given its inputs and prerequisites.
+
+        The key changes if the content of any input file, or the key of any
+        prerequisite, changes.
+        """
+        digest = hashlib.sha256(repr(task).encode())
+        for path in sorted(input_paths):
+            digest.update(str(path).encode())
+            digest.update(self._hash_file(path))
+        for key in sorted(prerequisite_keys):
+            digest.update(key.encode())
+        return digest.hexdigest()
+
+    def get(self, key, default=None):
+        """Return the result stored by key, or default if there is none."""
+        path = os.path.join(self._directory, key)
+        try:
+            with open(path, 'rb') as file:
+                result = pickle.load(file)
+        except FileNotFoundError:
+            return default
+        # Mark it as recently used.
+        os.utime(path)
+        return result
+
+    def put(self, key, result):
+        """Store a result by key, and evict old ones if necessary."""
+        path = os.path.join(self._directory, key)
+        # Write into a temporary file, so that readers never see a partial
+        # file, even if multiple processes share the directory.
+        descriptor, temp_path = tempfile.mkstemp(dir=self._directory,
+                                                 suffix='.temp')
+        with os.fdopen(descriptor, 'wb') as file:
+            pickle.dump(result, file)
+        if os.path.exists(path):
+            self._n_bytes -= os.path.getsize(path)
+        self._n_bytes += os.path.getsize(temp_path)
+        os.replace(temp_path, path)
+        if self._n_bytes > self._max_bytes:
+            self._evict()
+
+    def _evict(self):
+        entries = [entry for entry in os.scandir(self._directory)
+                   if entry.is_file() and not entry.name.endswith('.temp')]
+        entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+        self._n_bytes = sum(entry.stat().st_size for entry in entries)
+        # Evict until half of the budget is left, to avoid evicting on
+        # every put().
+        for entry in entries:
+            if self._n_bytes <= self._max_bytes // 2:
+                break
+            self._n_bytes -= entry.stat().st_size
+            os.remove(entry.path)
+
+    def _hash_file(self, path):
+        stat = os.stat(path)
+        cached = self._digests.get(path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 16), b''):
+                digest.update(block)
+        self._digests[path] = (stat.st_mtime_ns, stat.st_size,
+                               digest.digest())
+        return digest.digest()
+
+
+if __name__ == "__main__":
+    pass
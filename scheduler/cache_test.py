@@ -0,0 +1,65 @@
+"""Test classes defined in cache.py."""
+
+import os
+import tempfile
+import time
+import unittest
+
+from cache import BuildCache
+
+
+class TestBuildCache(unittest.TestCase):
+    """Test the correctness of cache.BuildCache."""
+
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self._directory = os.path.join(self._temp.name, 'cache')
+
+    def tearDown(self):
+        self._temp.cleanup()
+
+    def test_get_and_put(self):
+        """Test storing and loading results."""
+        a_cache = BuildCache(self._directory)
+        self.assertEqual(a_cache.get('A'), None)
+        self.assertEqual(a_cache.get('A', 'missing'), 'missing')
+        a_cache.put('A', {'result': 1})
+        self.assertEqual(a_cache.get('A'), {'result': 1})
+        a_cache.put('A', None)
+        self.assertEqual(a_cache.get('A', 'missing'), None)
+        # Results persist across instances.
+        a_cache.put('B', [2])
+        self.assertEqual(BuildCache(self._directory).get('B'), [2])
+
+    def test_key(self):
+        """Test keys depending on inputs and prerequisites."""
+        a_cache = BuildCache(self._directory)
+        path = os.path.join(self._temp.name, 'input.txt')
+        with open(path, 'w') as file:
+            file.write('old')
+        key = a_cache.key('A', (path,), ('k',))
+        self.assertEqual(key, a_cache.key('A', (path,), ('k',)))
+        self.assertNotEqual(key, a_cache.key('B', (path,), ('k',)))
+        self.assertNotEqual(key, a_cache.key('A', (), ('k',)))
+        self.assertNotEqual(key, a_cache.key('A', (path,), ('j',)))
+        with open(path, 'w') as file:
+            file.write('new')
+        os.utime(path, ns=(0, 0))
+        self.assertNotEqual(key, a_cache.key('A', (path,), ('k',)))
+
+    def test_eviction(self):
+        """Test evicting the least recently used results."""
+        a_cache = BuildCache(self._directory, max_bytes=3000)
+        for key in 'ABC':
+            a_cache.put(key, bytes(900))
+            # Make the modification times distinguishable.
+            time.sleep(0.01)
+        # Use A, so that B becomes the least recently used.
+        self.assertEqual(a_cache.get('A'), bytes(900))
+        a_cache.put('D', bytes(900))
+        self.assertEqual(a_cache.get('B'), None)
+        self.assertEqual(a_cache.get('D'), bytes(900))
+
+
+if __name__ == "__main__":
+    unittest.main()
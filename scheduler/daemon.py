@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Serve a Scheduler held in memory over a Unix domain socket."""
+
+import asyncio
+import json
+import socket
+
+from graph import CycleError
+from scheduler import Scheduler
+
+
+class SchedulerDaemon:
+    """Answer requests to a Scheduler, caching results until it changes.
+
+    Each request and each response is a line of JSON.  A request is an
+    object whose 'command' is one of:
+
+        {"command": "add", "edges": [[task, prerequisite], ...]}
+        {"command": "load", "lines": [line, ...]}
+        {"command": "schedule"}
+        {"command": "waves"}
+        {"command": "depends_on", "pairs": [[task, prerequisite], ...]}
+
+    A response is {"result": ...} on success or {"error": message}.
+    """
+
+    def __init__(self, a_scheduler=None):
+        if a_scheduler is None:
+            a_scheduler = Scheduler()
+        self._scheduler = a_scheduler
+        # _results[command] is the result of a query since the last change.
+        self._results = dict()
+        self._commands = {
+            'add': self._add,
+            'load': self._load,
+            'schedule': self._schedule,
+            'waves': self._waves,
+            'depends_on': self._depends_on,
+        }
+
+    def handle(self, request):
+        """Return the response to a request, both of which are dicts."""
+        if not isinstance(request, dict):
+            return {'error': 'A request should be an object.'}
+        command = request.get('command')
+        if command not in self._commands:
+            return {'error': "Unknown command '{0}'.".format(command)}
+        try:
+            return {'result': self._commands[command](request)}
+        except (AssertionError, CycleError, KeyError, TypeError,
+                ValueError) as error:
+            return {'error': str(error)}
+
+    async def serve(self, path):
+        """Serve requests on a Unix domain socket at path forever."""
+        server = await asyncio.start_unix_server(self._serve_client, path)
+        async with server:
+            await server.serve_forever()
+
+    async def _serve_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = self.handle(json.loads(line))
+                except ValueError as error:
+                    response = {'error': str(error)}
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    def _add(self, request):
+        edges = _to_pairs(request['edges'])
+        if edges:
+            try:
+                self._scheduler.add_edges(edges)
+            finally:
+                self._results.clear()
+        return self._scheduler.n_tasks()
+
+    def _load(self, request):
+        lines = request['lines']
+        if not (isinstance(lines, list) and
+                all(isinstance(line, str) for line in lines)):
+            raise ValueError('Lines should be a list of strings.')
+        try:
+            self._scheduler.load_todo_list(lines)
+        finally:
+            self._results.clear()
+        return self._scheduler.n_tasks()
+
+    def _schedule(self, _):
+        if 'schedule' not in self._results:
+            # Sort the groups to make the result independent of hashing.
+            self._results['schedule'] = sorted(
+                list(a_component) for a_component in
+                self._scheduler.schedule())
+        return self._results['schedule']
+
+    def _waves(self, _):
+        if 'waves' not in self._results:
+            self._results['waves'] = [
+                list(a_wave) for a_wave in
+                self._scheduler.schedule_in_waves()]
+        return self._results['waves']
+
+    def _depends_on(self, request):
+        # The scheduler keeps its own index until the next change.
+        pairs = _to_pairs(request['pairs'])
+        return list(self._scheduler.depends_on_many(pairs))
+
+
+def _to_pairs(pairs):
+    # Check that pairs is a list of pairs of tasks before changing anything.
+    if not isinstance(pairs, list):
+        raise ValueError('Pairs should be a list.')
+    for pair in pairs:
+        if not (isinstance(pair, list) and len(pair) == 2 and
+                all(isinstance(task, str) for task in pair)):
+            raise ValueError('{0} is not a pair of tasks.'.format(
+                json.dumps(pair)))
+    return [tuple(pair) for pair in pairs]
+
+
+def query(path, request):
+    """Send a request to the daemon at path and return its response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path)
+        client.sendall(json.dumps(request).encode() + b'\n')
+        with client.makefile('rb') as file:
+            return json.loads(file.readline())
+
+
+if __name__ == "__main__":
+    import argparse
+    PARSER = argparse.ArgumentParser(
+        description='Serve a scheduler over a Unix domain socket.')
+    PARSER.add_argument('socket', help='path of the socket')
+    PARSER.add_argument('-l', '--load', metavar='SNAPSHOT',
+                        help='serve tasks loaded from a snapshot')
+    ARGS = PARSER.parse_args()
+    A_SCHEDULER = None
+    if ARGS.load:
+        A_SCHEDULER = Scheduler.load_snapshot(ARGS.load)
+    asyncio.run(SchedulerDaemon(A_SCHEDULER).serve(ARGS.socket))
@@ -0,0 +1,97 @@
+"""Test classes defined in daemon.py."""
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from daemon import SchedulerDaemon
+
+
+class TestSchedulerDaemon(unittest.TestCase):
+    """Test the correctness of daemon.SchedulerDaemon."""
+
+    def test_handle(self):
+        """Test answering requests and caching results."""
+        a_daemon = SchedulerDaemon()
+        # Build two linked lists:
+        #   A <- B <- C
+        #   1 <- 2
+        response = a_daemon.handle(
+            {'command': 'add', 'edges': [['B', 'A'], ['C', 'B']]})
+        self.assertEqual(response, {'result': 3})
+        response = a_daemon.handle({'command': 'load', 'lines': ['2 1\n']})
+        self.assertEqual(response, {'result': 5})
+        response = a_daemon.handle({'command': 'schedule'})
+        self.assertEqual(response, {'result': [['1', '2'], ['A', 'B', 'C']]})
+        # The cached result is returned until the next change.
+        self.assertIs(a_daemon.handle({'command': 'schedule'})['result'],
+                      response['result'])
+        response = a_daemon.handle({'command': 'waves'})
+        self.assertEqual(len(response['result']), 3)
+        response = a_daemon.handle(
+            {'command': 'depends_on', 'pairs': [['C', 'A'], ['A', 'C']]})
+        self.assertEqual(response, {'result': [True, False]})
+        # Join the two lists by 1 <- A.
+        a_daemon.handle({'command': 'add', 'edges': [['A', '1']]})
+        response = a_daemon.handle({'command': 'schedule'})
+        self.assertEqual(len(response['result']), 1)
+        self.assertEqual(sorted(response['result'][0]),
+                         ['1', '2', 'A', 'B', 'C'])
+        response = a_daemon.handle(
+            {'command': 'depends_on', 'pairs': [['C', '1']]})
+        self.assertEqual(response, {'result': [True]})
+
+    def test_errors(self):
+        """Test responding errors instead of raising them."""
+        a_daemon = SchedulerDaemon()
+        self.assertIn('error', a_daemon.handle({'command': 'unknown'}))
+        self.assertIn('error', a_daemon.handle({'command': 'add'}))
+        self.assertIn('error', a_daemon.handle([1]))
+        # Invalid pairs add nothing.
+        a_daemon.handle({'command': 'add', 'edges': [['B', 'A']]})
+        a_daemon.handle({'command': 'schedule'})
+        for edges in ([['D', 'C'], ['E', 'F', 'G']], [['D', 'C'], ['E', 1]],
+                      [['D', 'C'], 'EF'], {'D': 'C'}):
+            response = a_daemon.handle({'command': 'add', 'edges': edges})
+            self.assertIn('error', response)
+        response = a_daemon.handle({'command': 'load', 'lines': ['D C', 1]})
+        self.assertIn('error', response)
+        response = a_daemon.handle({'command': 'depends_on', 'pairs': [[1]]})
+        self.assertIn('error', response)
+        response = a_daemon.handle({'command': 'schedule'})
+        self.assertEqual(response, {'result': [['A', 'B']]})
+        # Make a cycle A <- B <- A.
+        a_daemon.handle({'command': 'add', 'edges': [['B', 'A'], ['A', 'B']]})
+        response = a_daemon.handle({'command': 'schedule'})
+        self.assertTrue(response['error'].startswith('Cycle detected'))
+
+    def test_serve(self):
+        """Test serving requests over a Unix domain socket."""
+        async def talk(path):
+            server = asyncio.ensure_future(SchedulerDaemon().serve(path))
+            while not os.path.exists(path):
+                await asyncio.sleep(0.01)
+            reader, writer = await asyncio.open_unix_connection(path)
+            responses = list()
+            for request in ({'command': 'add', 'edges': [['B', 'A']]},
+                            {'command': 'schedule'}):
+                writer.write(json.dumps(request).encode() + b'\n')
+                responses.append(json.loads(await reader.readline()))
+            writer.write(b'not json\n')
+            responses.append(json.loads(await reader.readline()))
+            writer.close()
+            await writer.wait_closed()
+            server.cancel()
+            return responses
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'socket')
+            responses = asyncio.run(talk(path))
+        self.assertEqual(responses[:2],
+                         [{'result': 2}, {'result': [['A', 'B']]}])
+        self.assertIn('error', responses[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,21 @@
 
 import abc
 from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+
+class CycleError(ValueError):
+    """Raised if a cycle is found in a graph supposed to be acyclic.
+
+    Its cycles attribute is a tuple of cycles, each of which is a tuple of
+    the vertices on it.
+    """
+
+    def __init__(self, cycles):
+        super().__init__('Cycle detected: {0}'.format('; '.join(
+            ', '.join(str(i) for i in cycle) for cycle in cycles)))
+        self.cycles = cycles
 
 
 class AbstractGraph(abc.ABC):
@@ -24,22 +39,48 @@ class DirectedGraph(AbstractGraph):
         # Suppose vertex[i] is the i-th vertex, then
         # _neighbor[i] is the set of neighbors of vertex[i]
         self._neighbor = list()
+        # _version is increased whenever this graph is changed.
+        self._version = 0
 
     def n_vertices(self):
         """Return the total number of vertices in this graph."""
         return len(self._neighbor)
 
+    def version(self):
+        """Return a number, which changes whenever this graph changes."""
+        return self._version
+
     def add(self, i):
         """Add a vertex labeled by an int to this container."""
         assert isinstance(i, int) and i >= 0
-        while not self.has_vertex(i):
-            self._neighbor.append(set())
+        n_vertices = self.n_vertices()
+        if i >= n_vertices:
+            self._neighbor.extend(set() for _ in range(n_vertices, i + 1))
+            self._version += 1
 
     def connect(self, j, k):
         """Connect vertex[j] to vertex[k]."""
         self.add(j)
         self.add(k)
-        self._neighbor[j].add(k)
+        if k not in self._neighbor[j]:
+            self._neighbor[j].add(k)
+            self._version += 1
+
+    def disconnect(self, j, k):
+        """Remove the connection from vertex[j] to vertex[k], if any."""
+        if self.has_vertex(j) and k in self._neighbor[j]:
+            self._neighbor[j].discard(k)
+            self._version += 1
+
+    def connect_many(self, pairs):
+        """Connect vertex[j] to vertex[k] for each (j, k) in pairs.
+
+        All vertices in pairs must have been added.
+        """
+        neighbor = self._neighbor
+        for j, k in pairs:
+            neighbor[j].add(k)
+        self._version += 1
 
     def connected(self, j, k):
         """Return True if vertex[k] is a neighbor of vertex[j].
@@ -58,17 +99,85 @@ class DirectedGraph(AbstractGraph):
             return frozenset(self._neighbor[i])
         return frozenset()
 
+    def iter_neighbors(self, i):
+        """Return an iterable over vertex[i]'s neighbors without copying.
+
+        The graph must not be modified while the iterable is in use.
+        """
+        return self._neighbor[i]
+
+    def freeze(self):
+        """Return a FrozenGraph containing the same vertices and edges."""
+        offset = array('l', [0])
+        target = array('l')
+        for neighbors in self._neighbor:
+            target.extend(sorted(neighbors))
+            offset.append(len(target))
+        return FrozenGraph(offset, target)
+
+
+class FrozenGraph(AbstractGraph):
+    """An immutable directed graph in compressed sparse row (CSR) format.
+
+    Usually built by DirectedGraph.freeze(), which takes much less memory
+    than a set per vertex and keeps neighbors contiguous in memory.
+    """
+
+    def __init__(self, offset, target):
+        # Suppose vertex[i] is the i-th vertex, then its neighbors are
+        # stored in ascending order in target[offset[i]:offset[i+1]].
+        assert len(offset) > 0 and offset[-1] == len(target)
+        self._offset = offset
+        self._target = target
+        self._target_view = memoryview(target)
+
+    def n_vertices(self):
+        """Return the total number of vertices in this graph."""
+        return len(self._offset) - 1
+
+    def n_edges(self):
+        """Return the total number of edges in this graph."""
+        return len(self._target)
+
+    @staticmethod
+    def version():
+        """Return a number, which never changes since this graph is frozen."""
+        return 0
+
+    def arrays(self):
+        """Return the offset array and the target array."""
+        return self._offset, self._target
+
+    def connected(self, j, k):
+        """Return True if vertex[k] is a neighbor of vertex[j].
+
+        Return False, if either of them is not in this graph.
+        """
+        if (not self.has_vertex(j)) or (not self.has_vertex(k)):
+            return False
+        if j == k:
+            return True
+        first, last = self._offset[j], self._offset[j+1]
+        i = bisect_left(self._target, k, first, last)
+        return i < last and self._target[i] == k
+
+    def neighbors(self, i):
+        """Return a set containing vertex[i]'s neighbors."""
+        if self.has_vertex(i):
+            return frozenset(self.iter_neighbors(i))
+        return frozenset()
+
+    def iter_neighbors(self, i):
+        """Return an iterable over vertex[i]'s neighbors without copying."""
+        return self._target_view[self._offset[i]:self._offset[i+1]]
+
 
 class Reachability:
     """Check reachability from one vertex to another in a directed graph."""
 
     def __init__(self, a_graph):
         self._graph = a_graph
-        self._touched = array('b')
-        i = 0
-        while i < a_graph.n_vertices():
-            self._touched.append(False)
-            i += 1
+        self._touched = array('b', bytes(a_graph.n_vertices()))
 
     def has_path(self, j, k):
         """Is there a directed path from j to k."""
@@ -88,45 +197,587 @@ class Reachability:
             self._touched[i] = False
 
     def _depth_first_touch(self, i):
-        self._touched[i] = True
-        for k in self._graph.neighbors(i):
-            if not self._touched[k]:
-                self._depth_first_touch(k)
+        # Use an explicit stack instead of recursion,
+        # so that long paths do not exceed the recursion limit.
+        touched = self._touched
+        neighbors = self._graph.iter_neighbors
+        touched[i] = True
+        stack = [i]
+        while stack:
+            for k in neighbors(stack.pop()):
+                if not touched[k]:
+                    touched[k] = True
+                    stack.append(k)
 
 
-class TopologicalSort:
-    """Topologically sort vertices in a directed graph."""
+class ReachabilityIndex:
+    """Check reachability in a directed acyclic graph by interval labels.
+
+    A depth-first search labels each vertex by its post-order number, the
+    smallest post-order number in its search subtree, and the smallest one
+    among all vertices reachable from it.  Most queries are then answered in
+    O(1) time: a descendant in the search tree is reachable, while a vertex
+    whose interval is not nested is not.  Only the rest need a search, which
+    is pruned by the same labels.  The labels take O(V) memory and O(V+E)
+    time to build, and are rebuilt lazily on the first query after the graph
+    has changed.
+    """
+
+    def __init__(self, a_graph):
+        self._graph = a_graph
+        # _post[i] is the post-order number of vertex[i].
+        self._post = array('l')
+        # _tree_low[i] is the smallest _post in the search subtree of
+        # vertex[i], so vertex[k] is in the subtree if
+        # _tree_low[i] <= _post[k] <= _post[i].
+        self._tree_low = array('l')
+        # _low[i] is the smallest _post of the vertices reachable from
+        # vertex[i].
+        self._low = array('l')
+        self._version = None
+
+    def has_path(self, j, k):
+        """Is there a directed path from j to k."""
+        if not self._graph.has_vertex(j):
+            return False
+        if not self._graph.has_vertex(k):
+            return False
+        self._update()
+        return self._has_path(j, k)
+
+    def has_paths(self, pairs):
+        """Return a tuple telling whether there is a path for each (j, k)."""
+        return tuple(self.has_path(j, k) for j, k in pairs)
+
+    def _has_path(self, j, k):
+        post, tree_low, low = self._post, self._tree_low, self._low
+        post_k = post[k]
+        if post_k > post[j] or low[k] < low[j]:
+            return False
+        if tree_low[j] <= post_k:
+            return True
+        # Search from j, skipping vertices whose interval excludes k.
+        neighbors = self._graph.iter_neighbors
+        found = {j}
+        stack = [j]
+        while stack:
+            for i in neighbors(stack.pop()):
+                if i in found or post[i] < post_k or low[i] > low[k]:
+                    continue
+                if tree_low[i] <= post_k:
+                    return True
+                found.add(i)
+                stack.append(i)
+        return False
+
+    def _update(self):
+        if self._version == self._graph.version():
+            return
+        n_vertices = self._graph.n_vertices()
+        neighbors = self._graph.iter_neighbors
+        post = array('l', [-1]) * n_vertices
+        tree_low = array('l', [0]) * n_vertices
+        low = array('l', [0]) * n_vertices
+        on_stack = array('b', bytes(n_vertices))
+        n_finished = 0
+        for source in range(n_vertices):
+            if post[source] >= 0:
+                continue
+            # Use an explicit stack instead of recursion,
+            # so that long paths do not exceed the recursion limit.
+            on_stack[source] = True
+            tree_low[source] = n_finished
+            stack = [(source, iter(neighbors(source)))]
+            while stack:
+                i, unvisited = stack[-1]
+                for k in unvisited:
+                    if on_stack[k]:
+                        components = StronglyConnectedComponents(self._graph)
+                        raise CycleError(components.cycles())
+                    if post[k] < 0:
+                        on_stack[k] = True
+                        tree_low[k] = n_finished
+                        stack.append((k, iter(neighbors(k))))
+                        break
+                else:
+                    stack.pop()
+                    on_stack[i] = False
+                    post[i] = n_finished
+                    n_finished += 1
+                    low_i = tree_low[i]
+                    for k in neighbors(i):
+                        if low[k] < low_i:
+                            low_i = low[k]
+                    low[i] = low_i
+        self._post, self._tree_low, self._low = post, tree_low, low
+        self._version = self._graph.version()
+
+
+class TransitiveReduction:
+    """Find redundant edges in a directed acyclic graph.
+
+    An edge from j to k is redundant, if there is another path from j to k.
+    Vertices are visited in topological order, each of which gets the set
+    of vertices reachable from it as a bitset.  The neighbors of a vertex
+    are checked from the latest to the earliest, since a neighbor can only
+    be reached from later ones.
+
+    A vertex is indexed in bitsets by its position in its connected
+    component, and its bitset is freed once all its dependents have been
+    visited, so the bitsets take O(C*C) bits for the largest component C.
+    """
 
     def __init__(self, a_graph):
         self._graph = a_graph
-        self._touched = array('b')
-        self._finished = array('b')
-        i = 0
-        while i < a_graph.n_vertices():
-            self._touched.append(False)
-            self._finished.append(False)
-            i += 1
+
+    def redundant_edges(self):
+        """Return a tuple of (j, k) for each redundant edge from j to k."""
+        sorted_vertices = TopologicalSort(self._graph).sort()
+        n_vertices = len(sorted_vertices)
+        neighbors = self._graph.iter_neighbors
+        a_union = UnionFind()
+        # n_dependents[k] is the number of unvisited vertices depending on k.
+        n_dependents = array('l', [0]) * n_vertices
+        if n_vertices:
+            a_union.add(n_vertices - 1)
+        for j in sorted_vertices:
+            for k in neighbors(j):
+                n_dependents[k] += 1
+            a_union.connect_many((j, k) for k in neighbors(j))
+        # bit[i] is the index of vertex[i] in bitsets, and position[i] is
+        # its position in sorted_vertices.
+        roots = a_union.roots()
+        n_indexed = array('l', [0]) * n_vertices
+        bit = array('l', [0]) * n_vertices
+        position = array('l', [0]) * n_vertices
+        for p, i in enumerate(sorted_vertices):
+            bit[i] = n_indexed[roots[i]]
+            n_indexed[roots[i]] += 1
+            position[i] = p
+        del roots, n_indexed
+        closure = dict()
+        redundant_edges = list()
+        for j in sorted_vertices:
+            reachable = 0
+            for k in sorted(neighbors(j), key=position.__getitem__,
+                            reverse=True):
+                if reachable >> bit[k] & 1:
+                    redundant_edges.append((j, k))
+                else:
+                    reachable |= closure[k]
+                n_dependents[k] -= 1
+                if n_dependents[k] == 0:
+                    del closure[k]
+            if n_dependents[j]:
+                closure[j] = reachable | (1 << bit[j])
+        return tuple(redundant_edges)
+
+
+class TopologicalSort:
+    """Topologically sort vertices in a directed graph.
+
+    Two algorithms are available, neither of which recurses:
+      - 'dfs': depth-first search driven by an explicit stack.
+      - 'kahn': Kahn's algorithm driven by counting in-degrees.
+    Both run in O(V+E) time.  Every vertex is placed after its neighbors.
+    """
+
+    ALGORITHMS = ('dfs', 'kahn')
+
+    def __init__(self, a_graph, algorithm='dfs'):
+        assert algorithm in TopologicalSort.ALGORITHMS, \
+            "Unknown algorithm '{0}'.".format(algorithm)
+        self._graph = a_graph
+        self._algorithm = algorithm
         self._sorted = list()
         self._done = False
 
     def sort(self):
         """Return an array of vertices sorted in topological order."""
         if not self._done:
-            for i in range(self._graph.n_vertices()):
-                if not self._touched[i]:
-                    self._depth_first_touch(i)
+            if self._algorithm == 'kahn':
+                acyclic = self._sort_by_kahn()
+            else:
+                acyclic = self._sort_by_dfs()
+            if not acyclic:
+                self._sorted = list()
+                components = StronglyConnectedComponents(self._graph)
+                raise CycleError(components.cycles())
             self._done = True
         assert len(self._sorted) == self._graph.n_vertices()
         return tuple(self._sorted)
 
-    def _depth_first_touch(self, i):
-        self._touched[i] = True
-        for k in self._graph.neighbors(i):
-            if not self._finished[k]:
-                assert not self._touched[k], 'Cycle detected!'
-                self._depth_first_touch(k)
-        self._finished[i] = True
-        self._sorted.append(i)
+    def sort_from(self, sources):
+        """Return the vertices reachable from sources in topological order.
+
+        Unlike sort(), only the reachable vertices and their edges are
+        visited, so the cost does not depend on the size of the graph.
+        """
+        # Use dicts instead of arrays to avoid allocating O(V) space.
+        touched = defaultdict(bool)
+        finished = defaultdict(bool)
+        self._sorted = list()
+        for i in sources:
+            assert self._graph.has_vertex(i), \
+                "{0} is not in this graph.".format(i)
+            if not touched[i]:
+                if not self._depth_first_touch(i, touched, finished):
+                    self._sorted = list()
+                    components = StronglyConnectedComponents(self._graph)
+                    raise CycleError(components.cycles())
+        sorted_vertices = tuple(self._sorted)
+        self._sorted = list()
+        return sorted_vertices
+
+    def _sort_by_dfs(self):
+        n_vertices = self._graph.n_vertices()
+        touched = array('b', bytes(n_vertices))
+        finished = array('b', bytes(n_vertices))
+        for i in range(n_vertices):
+            if not touched[i]:
+                if not self._depth_first_touch(i, touched, finished):
+                    return False
+        return True
+
+    def _depth_first_touch(self, i, touched, finished):
+        # Each frame holds a vertex and an iterator over its unvisited
+        # neighbors, which mimics the call stack of a recursive search.
+        neighbors = self._graph.iter_neighbors
+        touched[i] = True
+        stack = [(i, iter(neighbors(i)))]
+        while stack:
+            i, unvisited = stack[-1]
+            for k in unvisited:
+                if not finished[k]:
+                    if touched[k]:
+                        return False
+                    touched[k] = True
+                    stack.append((k, iter(neighbors(k))))
+                    break
+            else:
+                stack.pop()
+                finished[i] = True
+                self._sorted.append(i)
+        return True
+
+    def _sort_by_kahn(self):
+        n_vertices = self._graph.n_vertices()
+        neighbors = self._graph.iter_neighbors
+        # n_dependents[k] is the number of vertices connected to vertex[k].
+        n_dependents = array('l', [0]) * n_vertices
+        for i in range(n_vertices):
+            for k in neighbors(i):
+                n_dependents[k] += 1
+        queue = [i for i in range(n_vertices) if n_dependents[i] == 0]
+        # Vertices appended to the queue are visited by the same loop.
+        for i in queue:
+            for k in neighbors(i):
+                n_dependents[k] -= 1
+                if n_dependents[k] == 0:
+                    queue.append(k)
+        queue.reverse()
+        self._sorted = queue
+        return len(queue) == n_vertices
+
+
+class StronglyConnectedComponents:
+    """Find strongly connected components in a directed graph.
+
+    Implement Tarjan's algorithm with an explicit stack in O(V+E) time.
+    """
+
+    def __init__(self, a_graph):
+        self._graph = a_graph
+
+    def components(self):
+        """Return a tuple of components, each of which is a tuple of vertices.
+
+        A component appears after all the components reachable from it.
+        """
+        n_vertices = self._graph.n_vertices()
+        neighbors = self._graph.iter_neighbors
+        # index[i] is the order in which vertex[i] is visited, and low[i] is
+        # the lowest index reachable from vertex[i] in the same component.
+        index = array('l', [-1]) * n_vertices
+        low = array('l', [0]) * n_vertices
+        on_stack = array('b', bytes(n_vertices))
+        stack = list()
+        components = list()
+        n_visited = 0
+        for source in range(n_vertices):
+            if index[source] >= 0:
+                continue
+            index[source] = low[source] = n_visited
+            n_visited += 1
+            stack.append(source)
+            on_stack[source] = True
+            frames = [(source, iter(neighbors(source)))]
+            while frames:
+                i, unvisited = frames[-1]
+                for k in unvisited:
+                    if index[k] < 0:
+                        index[k] = low[k] = n_visited
+                        n_visited += 1
+                        stack.append(k)
+                        on_stack[k] = True
+                        frames.append((k, iter(neighbors(k))))
+                        break
+                    if on_stack[k] and low[i] > index[k]:
+                        low[i] = index[k]
+                else:
+                    frames.pop()
+                    if frames and low[frames[-1][0]] > low[i]:
+                        low[frames[-1][0]] = low[i]
+                    if low[i] == index[i]:
+                        component = list()
+                        k = -1
+                        while k != i:
+                            k = stack.pop()
+                            on_stack[k] = False
+                            component.append(k)
+                        components.append(tuple(component))
+        return tuple(components)
+
+    def cycles(self):
+        """Return the components containing at least one cycle."""
+        cycles = list()
+        for component in self.components():
+            i = component[0]
+            if len(component) > 1 or i in self._graph.iter_neighbors(i):
+                cycles.append(component)
+        return tuple(cycles)
+
+
+class LevelSort:
+    """Sort vertices in a directed acyclic graph into levels.
+
+    Vertices without neighbors are at level 0, and every other vertex is
+    one level above the highest of its neighbors.  So vertices at the same
+    level are not connected, and each level only depends on lower ones.
+
+    If sorted_vertices is given, it is used as the topological order instead
+    of sorting again.
+    """
+
+    def __init__(self, a_graph, sorted_vertices=None):
+        self._graph = a_graph
+        self._sorted = sorted_vertices
+
+    def sort(self):
+        """Return a tuple of levels, each of which is a tuple of vertices."""
+        neighbors = self._graph.iter_neighbors
+        level = array('l', [0]) * self._graph.n_vertices()
+        levels = list()
+        sorted_vertices = self._sorted
+        if sorted_vertices is None:
+            sorted_vertices = TopologicalSort(self._graph).sort()
+        # Neighbors are visited before the vertices connected to them.
+        for i in sorted_vertices:
+            level_i = 0
+            for k in neighbors(i):
+                if level_i <= level[k]:
+                    level_i = level[k] + 1
+            level[i] = level_i
+            if level_i == len(levels):
+                levels.append(list())
+            levels[level_i].append(i)
+        return tuple(tuple(vertices) for vertices in levels)
+
+
+class CriticalPath:
+    """Analyze the longest weighted path in a directed acyclic graph.
+
+    Each vertex is regarded as an activity lasting costs[i], which can only
+    start after all of its neighbors have finished.  If sorted_vertices is
+    given, it is used as the topological order instead of sorting again.
+    """
+
+    def __init__(self, a_graph, costs, sorted_vertices=None):
+        self._graph = a_graph
+        self._costs = costs
+        if sorted_vertices is None:
+            sorted_vertices = TopologicalSort(a_graph).sort()
+        self._sorted = sorted_vertices
+        n_vertices = len(self._sorted)
+        neighbors = a_graph.iter_neighbors
+        # _earliest[i] is the earliest start time of vertex[i].
+        self._earliest = array('d', [0.0]) * n_vertices
+        self._makespan = 0.0
+        for i in self._sorted:
+            start = 0.0
+            for k in neighbors(i):
+                finish = self._earliest[k] + costs[k]
+                if start < finish:
+                    start = finish
+            self._earliest[i] = start
+            if self._makespan < start + costs[i]:
+                self._makespan = start + costs[i]
+        # _latest[i] is the latest start time of vertex[i], which is
+        # initialized by its latest finish time.
+        self._latest = array('d', [self._makespan]) * n_vertices
+        for i in reversed(self._sorted):
+            self._latest[i] -= costs[i]
+            for k in neighbors(i):
+                if self._latest[k] > self._latest[i]:
+                    self._latest[k] = self._latest[i]
+
+    def makespan(self):
+        """Return the earliest time to finish all vertices."""
+        return self._makespan
+
+    def earliest_start(self, i):
+        """Return the earliest time to start vertex[i]."""
+        return self._earliest[i]
+
+    def latest_start(self, i):
+        """Return the latest time to start vertex[i] without delaying all."""
+        return self._latest[i]
+
+    def slack(self, i):
+        """Return the time vertex[i] can be delayed without delaying all."""
+        return self._latest[i] - self._earliest[i]
+
+    def path(self):
+        """Return a tuple of vertices on a critical path in sorted order."""
+        costs = self._costs
+        earliest = self._earliest
+        path = list()
+        for i in self._sorted:
+            if earliest[i] + costs[i] == self._makespan:
+                path.append(i)
+                break
+        while path:
+            i = path[-1]
+            for k in self._graph.iter_neighbors(i):
+                if earliest[k] + costs[k] == earliest[i]:
+                    path.append(k)
+                    break
+            else:
+                break
+        path.reverse()
+        return tuple(path)
+
+
+class DynamicTopologicalSort:
+    """Maintain the topological order of a directed graph being extended.
+
+    Implement the algorithm by Pearce and Kelly (2006): connecting two
+    vertices only reorders the vertices lying between them in the current
+    order, instead of sorting the whole graph again.
+    """
+
+    def __init__(self, a_graph):
+        self._graph = a_graph
+        n_vertices = a_graph.n_vertices()
+        # _vertex[p] is the vertex at the p-th position of the order.
+        self._vertex = array('l', TopologicalSort(a_graph).sort())
+        # _front[p] is the vertex at the (-1-p)-th position of the order,
+        # which is negative for vertices put before all the others.
+        self._front = array('l')
+        # _position[i] is the position of vertex[i] in the order.
+        self._position = array('l', [0]) * n_vertices
+        for p, i in enumerate(self._vertex):
+            self._position[i] = p
+        # _dependents[k] is the set of vertices connected to vertex[k].
+        self._dependents = [set() for _ in range(n_vertices)]
+        for j in range(n_vertices):
+            for k in a_graph.iter_neighbors(j):
+                self._dependents[k].add(j)
+
+    def add(self, i, first=False):
+        """Add a vertex to the graph and append it to the order.
+
+        If first, put it before all the others instead, which saves
+        reordering if it is going to be a neighbor of existing vertices.
+        """
+        self._graph.add(i)
+        while len(self._position) < self._graph.n_vertices():
+            new_vertex = len(self._position)
+            if first:
+                self._position.append(-1 - len(self._front))
+                self._front.append(new_vertex)
+            else:
+                self._position.append(len(self._vertex))
+                self._vertex.append(new_vertex)
+            self._dependents.append(set())
+
+    def connect(self, j, k):
+        """Connect vertex[j] to vertex[k] and update the order.
+
+        The graph is left unchanged, if the new edge would make a cycle.
+        """
+        self.add(j)
+        self.add(k)
+        if j == k:
+            raise CycleError(((j,),))
+        lower = self._position[j]
+        upper = self._position[k]
+        if lower < upper:
+            # Vertex[k] must be moved before vertex[j].
+            later = self._search(j, self._dependents.__getitem__,
+                                 lower, upper, k)
+            earlier = self._search(k, self._graph.iter_neighbors,
+                                   lower, upper, j)
+            self._reorder(earlier, later)
+        self._graph.connect(j, k)
+        self._dependents[k].add(j)
+
+    def disconnect(self, j, k):
+        """Remove the connection from vertex[j] to vertex[k], if any.
+
+        The order is still valid, so nothing has to be moved.
+        """
+        self._graph.disconnect(j, k)
+        if self._graph.has_vertex(k):
+            self._dependents[k].discard(j)
+
+    def sort(self):
+        """Return an array of vertices sorted in topological order."""
+        assert len(self._front) + len(self._vertex) == \
+            self._graph.n_vertices()
+        return tuple(reversed(self._front)) + tuple(self._vertex)
+
+    def _search(self, source, next_vertices, lower, upper, forbidden):
+        # Collect vertices reachable from source with positions in
+        # [lower, upper], which are the only ones affected.
+        # found[i] is the vertex from which vertex[i] is found.
+        position = self._position
+        found = {source: source}
+        stack = [source]
+        while stack:
+            j = stack.pop()
+            for i in next_vertices(j):
+                if i == forbidden:
+                    raise CycleError((self._path(found, j) + (i,),))
+                if i not in found and lower <= position[i] <= upper:
+                    found[i] = j
+                    stack.append(i)
+        return found
+
+    @staticmethod
+    def _path(found, i):
+        # Trace back from vertex[i] to the source of a search.
+        path = [i]
+        while found[i] != i:
+            i = found[i]
+            path.append(i)
+        path.reverse()
+        return tuple(path)
+
+    def _reorder(self, earlier, later):
+        # Put the earlier ones before the later ones, using the positions
+        # they occupied and keeping the relative order within each group.
+        position = self._position
+        earlier = sorted(earlier, key=position.__getitem__)
+        later = sorted(later, key=position.__getitem__)
+        affected = earlier + later
+        slots = sorted(position[i] for i in affected)
+        for p, i in zip(slots, affected):
+            if p < 0:
+                self._front[-1 - p] = i
+            else:
+                self._vertex[p] = i
+            position[i] = p
 
 
 class UnionFind(AbstractGraph):
@@ -138,22 +789,69 @@ class UnionFind(AbstractGraph):
         self._parent = list()
         # _size[i] is the size of the largest tree containing vertex[i].
         self._size = list()
+        # _n_compressions is the number of steps compressing paths.
+        self._n_compressions = 0
+
+    @classmethod
+    def from_arrays(cls, parent, size):
+        """Return a container using the given parent and size arrays.
+
+        Both arrays are used without copying, so they must be writable.
+        """
+        assert len(parent) == len(size)
+        a_union = cls()
+        a_union._parent = parent
+        a_union._size = size
+        return a_union
+
+    def arrays(self):
+        """Return the parent array and the size array."""
+        return self._parent, self._size
 
     def add(self, i):
         """Add a vertex labeled by an int to this container."""
         assert isinstance(i, int) and i >= 0
-        while not self.has_vertex(i):
-            self._parent.append(self.n_vertices())
-            self._size.append(1)
+        n_vertices = self.n_vertices()
+        if i >= n_vertices:
+            self._parent.extend(range(n_vertices, i + 1))
+            self._size.extend([1] * (i + 1 - n_vertices))
 
     def connect(self, j, k):
         """Connect the two components containing j and k."""
         self.add(j)
         self.add(k)
         root_smaller, root_larger = self._compare_tree(j, k)
+        if root_smaller == root_larger:
+            return
         self._parent[root_smaller] = root_larger
         self._size[root_larger] += self._size[root_smaller]
 
+    def connect_many(self, pairs):
+        """Connect the two components containing j and k for each (j, k).
+
+        All vertices in pairs must have been added.
+        """
+        parent = self._parent
+        size = self._size
+        n_compressions = 0
+        for j, k in pairs:
+            # Find the roots, while compressing the paths as root() does.
+            while j != parent[j]:
+                parent[j] = parent[parent[j]]
+                j = parent[j]
+                n_compressions += 1
+            while k != parent[k]:
+                parent[k] = parent[parent[k]]
+                k = parent[k]
+                n_compressions += 1
+            if j == k:
+                continue
+            if size[j] < size[k]:
+                j, k = k, j
+            parent[k] = j
+            size[j] += size[k]
+        self._n_compressions += n_compressions
+
     def connected(self, j, k):
         """Return True if j and k are in the same component.
 
@@ -167,17 +865,44 @@ class UnionFind(AbstractGraph):
         """Return the total number of vertices in this container."""
         return len(self._size)
 
+    def n_compressions(self):
+        """Return the number of steps compressing paths so far."""
+        return self._n_compressions
+
     def root(self, i):
         """Return the root of the tree containing i."""
         assert self.has_vertex(i), "{0} is not in this container.".format(i)
+        n_compressions = 0
         while i != self._parent[i]:
             # Compress the path to make the tree flatter.
             grand_parent = self._parent[self._parent[i]]
             self._parent[i] = grand_parent
             # Update i and try the next iteration.
             i = grand_parent
+            n_compressions += 1
+        self._n_compressions += n_compressions
         return i
 
+    def roots(self):
+        """Return an array of the root of the tree containing each vertex.
+
+        All trees are flattened in one pass, so root() takes at most one
+        step until the next connecting.
+        """
+        parent = self._parent
+        n_compressions = 0
+        for i in range(len(parent)):
+            i_root = parent[i]
+            while i_root != parent[i_root]:
+                i_root = parent[i_root]
+            # Let every vertex on the path point to the root.
+            j = i
+            while parent[j] != i_root:
+                parent[j], j = i_root, parent[j]
+                n_compressions += 1
+        self._n_compressions += n_compressions
+        return array('l', parent)
+
     def _compare_tree(self, j, k):
         root_j = self.root(j)
         root_k = self.root(k)
@@ -186,5 +911,162 @@ class UnionFind(AbstractGraph):
         return root_k, root_j
 
 
+class CompactUnionFind(UnionFind):
+    """A UnionFind storing its parents and sizes in arrays of C longs.
+
+    Each entry takes 8 bytes instead of a pointer to an int object, which
+    saves most of the memory for large numbers of vertices, at the cost of
+    boxing ints on each access.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._parent = array('l')
+        self._size = array('l')
+
+
+class DynamicComponents(AbstractGraph):
+    """A container of connected components supporting disconnecting.
+
+    Unlike UnionFind, it stores the (undirected) edges, so a component can
+    be split when an edge is removed.  Whether the two ends are still
+    connected is checked by two searches running in turn from both ends,
+    which stop as soon as the smaller side is exhausted, so the cost is
+    proportional to the smaller side rather than the whole component.
+    """
+
+    def __init__(self):
+        # _adjacent[i] maps each vertex adjacent to vertex[i] to the number
+        # of edges between them.
+        self._adjacent = list()
+        # _label[i] is the label of the component containing vertex[i].
+        self._label = array('q')
+        # _members[label] is the set of vertices in a component, which is
+        # omitted for components consisting of a single vertex.
+        self._members = dict()
+        self._n_labels = 0
+
+    @classmethod
+    def from_graph(cls, a_graph):
+        """Return a container holding the components of a_graph."""
+        components = cls()
+        if a_graph.n_vertices():
+            components.add(a_graph.n_vertices() - 1)
+        for j in range(a_graph.n_vertices()):
+            for k in a_graph.iter_neighbors(j):
+                components.connect(j, k)
+        return components
+
+    def roots(self):
+        """Return an array of the label of the component of each vertex."""
+        return array('q', self._label)
+
+    def n_vertices(self):
+        """Return the total number of vertices in this container."""
+        return len(self._label)
+
+    def add(self, i):
+        """Add a vertex labeled by an int to this container."""
+        assert isinstance(i, int) and i >= 0
+        while not self.has_vertex(i):
+            self._adjacent.append(dict())
+            self._label.append(self._new_label())
+
+    def neighbors(self, i):
+        """Return a set of vertices sharing an edge with vertex[i]."""
+        if self.has_vertex(i):
+            return frozenset(self._adjacent[i])
+        return frozenset()
+
+    def connect(self, j, k):
+        """Add an edge between j and k, and merge their components."""
+        self.add(j)
+        self.add(k)
+        if j == k:
+            return
+        self._adjacent[j][k] = self._adjacent[j].get(k, 0) + 1
+        self._adjacent[k][j] = self._adjacent[k].get(j, 0) + 1
+        label_j, label_k = self._label[j], self._label[k]
+        if label_j == label_k:
+            return
+        members_j = self._members.pop(label_j, {j})
+        members_k = self._members.pop(label_k, {k})
+        # Relabel the smaller one.
+        if len(members_j) < len(members_k):
+            members_j, members_k = members_k, members_j
+            label_j = label_k
+        for i in members_k:
+            self._label[i] = label_j
+        members_j |= members_k
+        self._members[label_j] = members_j
+
+    def connect_many(self, pairs):
+        """Connect j and k for each (j, k) in pairs."""
+        for j, k in pairs:
+            self.connect(j, k)
+
+    def disconnect(self, j, k):
+        """Remove an edge between j and k, and split the component if needed.
+
+        Do nothing, if there is no such edge.
+        """
+        if j == k or not self.has_vertex(j) or k not in self._adjacent[j]:
+            return
+        for i, other in ((j, k), (k, j)):
+            self._adjacent[i][other] -= 1
+            if self._adjacent[i][other] == 0:
+                del self._adjacent[i][other]
+        if k in self._adjacent[j]:
+            return
+        separated = self._search_separated(j, k)
+        if separated is None:
+            return
+        label = self._label[j]
+        members = self._members[label]
+        members -= separated
+        if len(members) == 1:
+            del self._members[label]
+        new_label = self._new_label()
+        for i in separated:
+            self._label[i] = new_label
+        if len(separated) > 1:
+            self._members[new_label] = separated
+
+    def connected(self, j, k):
+        """Return True if j and k are in the same component.
+
+        Return False, if either of them has not been added.
+        """
+        if (not self.has_vertex(j)) or (not self.has_vertex(k)):
+            return False
+        return self._label[j] == self._label[k]
+
+    def root(self, i):
+        """Return the label of the component containing i."""
+        assert self.has_vertex(i), "{0} is not in this container.".format(i)
+        return self._label[i]
+
+    def _new_label(self):
+        # Labels are never reused, so they never collide.
+        self._n_labels += 1
+        return self._n_labels - 1
+
+    def _search_separated(self, j, k):
+        # Search from j and k in turn.  Return the vertices found by the
+        # search which is exhausted first, or None if the searches meet.
+        found = ({j}, {k})
+        stacks = ([j], [k])
+        while True:
+            for side in (0, 1):
+                if not stacks[side]:
+                    return found[side]
+                for i in self._adjacent[stacks[side].pop()]:
+                    if i in found[1 - side]:
+                        return None
+                    if i not in found[side]:
+                        found[side].add(i)
+                        stacks[side].append(i)
+
+
 if __name__ == "__main__":
     pass
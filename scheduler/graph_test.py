@@ -2,9 +2,21 @@
 
 import unittest
 
+import random
+
+from graph import CompactUnionFind
+from graph import CriticalPath
+from graph import CycleError
 from graph import DirectedGraph
+from graph import DynamicComponents
+from graph import DynamicTopologicalSort
+from graph import FrozenGraph
+from graph import LevelSort
 from graph import Reachability
+from graph import ReachabilityIndex
+from graph import StronglyConnectedComponents
 from graph import TopologicalSort
+from graph import TransitiveReduction
 from graph import UnionFind
 
 
@@ -76,6 +88,35 @@ class TestDirectedGraph(unittest.TestCase):
         self.assertEqual(a_graph.connected(0, 2), False)
         self.assertEqual(a_graph.connected(2, 0), False)
 
+    def test_disconnect(self):
+        """Test disconnect()."""
+        # Create [{1, 2}, {2}, set()].
+        a_graph = DirectedGraph()
+        a_graph.connect(0, 1)
+        a_graph.connect(0, 2)
+        a_graph.connect(1, 2)
+        version = a_graph.version()
+        # Disconnect non-existing edges, nothing changes.
+        a_graph.disconnect(2, 0)
+        a_graph.disconnect(3, 0)
+        self.assertEqual(a_graph.version(), version)
+        # Disconnect an existing edge.
+        a_graph.disconnect(0, 1)
+        self.assertNotEqual(a_graph.version(), version)
+        self.assertEqual(a_graph.neighbors(0), {2})
+        self.assertEqual(a_graph.n_vertices(), 3)
+
+    def test_connect_many(self):
+        """Test connect_many()."""
+        a_graph = DirectedGraph()
+        a_graph.add(2)
+        version = a_graph.version()
+        a_graph.connect_many([(0, 1), (0, 2), (1, 2), (0, 1)])
+        self.assertNotEqual(a_graph.version(), version)
+        self.assertEqual(a_graph.neighbors(0), {1, 2})
+        self.assertEqual(a_graph.neighbors(1), {2})
+        self.assertEqual(a_graph.neighbors(2), set())
+
     def test_neighbors(self):
         """Test root()."""
         # Create [{1, 2}, {2}, set()].
@@ -92,6 +133,52 @@ class TestDirectedGraph(unittest.TestCase):
         self.assertEqual(a_graph.neighbors(4), set())
 
 
+class TestFrozenGraph(unittest.TestCase):
+    """Test the correctness of graph.FrozenGraph."""
+
+    def test_empty_graph(self):
+        """Test public methods on an empty graph."""
+        a_graph = DirectedGraph().freeze()
+        self.assertTrue(isinstance(a_graph, FrozenGraph))
+        self.assertEqual(a_graph.n_vertices(), 0)
+        self.assertEqual(a_graph.n_edges(), 0)
+        self.assertEqual(a_graph.connected(0, 0), False)
+        self.assertEqual(a_graph.neighbors(0), set())
+
+    def test_freeze(self):
+        """Test freezing a non-empty graph."""
+        # Create [{1, 2}, {2}, set(), set()].
+        a_graph = DirectedGraph()
+        a_graph.connect(0, 2)
+        a_graph.connect(0, 1)
+        a_graph.connect(1, 2)
+        a_graph.add(3)
+        frozen_graph = a_graph.freeze()
+        self.assertEqual(frozen_graph.n_vertices(), 4)
+        self.assertEqual(frozen_graph.n_edges(), 3)
+        for j in range(5):
+            self.assertEqual(frozen_graph.neighbors(j), a_graph.neighbors(j))
+            for k in range(5):
+                self.assertEqual(frozen_graph.connected(j, k),
+                                 a_graph.connected(j, k))
+        self.assertEqual(tuple(frozen_graph.iter_neighbors(0)), (1, 2))
+
+    def test_traversal(self):
+        """Test Reachability and TopologicalSort on a frozen graph."""
+        # Build a linked list:
+        #   0 -> 1 -> 2
+        a_graph = DirectedGraph()
+        a_graph.connect(0, 1)
+        a_graph.connect(1, 2)
+        frozen_graph = a_graph.freeze()
+        checker = Reachability(frozen_graph)
+        self.assertTrue(checker.has_path(0, 2))
+        self.assertFalse(checker.has_path(2, 0))
+        for algorithm in TopologicalSort.ALGORITHMS:
+            a_sorter = TopologicalSort(frozen_graph, algorithm=algorithm)
+            self.assertEqual(a_sorter.sort(), (2, 1, 0))
+
+
 class TestReachability(unittest.TestCase):
     """Test the correctness of graph.Reachability."""
 
@@ -145,6 +232,160 @@ class TestReachability(unittest.TestCase):
         self.assertFalse(checker.has_path(1, 0))
         self.assertFalse(checker.has_path(2, 0))
 
+    def test_long_linked_list(self):
+        """Test public methods on a linked list deeper than the stack."""
+        # Build a linked list:
+        #   0 -> 1 -> ... -> n-1
+        n_vertices = 100000
+        a_graph = DirectedGraph()
+        for i in range(1, n_vertices):
+            a_graph.connect(i-1, i)
+        checker = Reachability(a_graph)
+        self.assertTrue(checker.has_path(0, n_vertices-1))
+        self.assertFalse(checker.has_path(n_vertices-1, 0))
+
+
+class TestReachabilityIndex(unittest.TestCase):
+    """Test the correctness of graph.ReachabilityIndex."""
+
+    def test_empty_graph(self):
+        """Test public methods on an empty graph."""
+        checker = ReachabilityIndex(DirectedGraph())
+        self.assertFalse(checker.has_path(0, 0))
+        self.assertEqual(checker.has_paths(((0, 1), (1, 0))), (False, False))
+
+    def test_random_graph(self):
+        """Compare with graph.Reachability on a random graph."""
+        a_random = random.Random(0)
+        a_graph = DirectedGraph()
+        checker = ReachabilityIndex(a_graph)
+        for _ in range(3):
+            for _ in range(50):
+                j = a_random.randrange(30)
+                k = a_random.randrange(30)
+                if j != k:
+                    a_graph.connect(max(j, k), min(j, k))
+            # The index is rebuilt after the graph has changed.
+            expected = Reachability(a_graph)
+            pairs = [(j, k) for j in range(31) for k in range(31)]
+            self.assertEqual(checker.has_paths(pairs),
+                             tuple(expected.has_path(j, k) for j, k in pairs))
+
+    def test_shuffled_graph(self):
+        """Compare with graph.Reachability on random graphs of any order."""
+        for seed in range(20):
+            a_random = random.Random(seed)
+            # Shuffle the vertices, so edges may go to either side.
+            shuffled = list(range(30))
+            a_random.shuffle(shuffled)
+            a_graph = DirectedGraph()
+            a_graph.add(29)
+            for _ in range(60):
+                j = a_random.randrange(30)
+                k = a_random.randrange(30)
+                if j != k:
+                    a_graph.connect(shuffled[max(j, k)], shuffled[min(j, k)])
+            checker = ReachabilityIndex(a_graph)
+            expected = Reachability(a_graph)
+            for j in range(30):
+                for k in range(30):
+                    self.assertEqual(checker.has_path(j, k),
+                                     expected.has_path(j, k))
+
+    def test_long_chain(self):
+        """Test a linked list too long for a closure of V*V bits."""
+        # Build a linked list 0 <- 1 <- ... <- 99999.
+        a_graph = DirectedGraph()
+        a_graph.add(99999)
+        a_graph.connect_many((j, j - 1) for j in range(1, 100000))
+        checker = ReachabilityIndex(a_graph)
+        self.assertTrue(checker.has_path(99999, 0))
+        self.assertTrue(checker.has_path(5, 1))
+        self.assertFalse(checker.has_path(1, 5))
+
+    def test_cycle(self):
+        """Test that a cycle raises a CycleError."""
+        # Build a cycle 0 -> 1 -> 0.
+        a_graph = DirectedGraph()
+        a_graph.connect(0, 1)
+        a_graph.connect(1, 0)
+        with self.assertRaises(CycleError):
+            ReachabilityIndex(a_graph).has_path(0, 1)
+
+    def test_version(self):
+        """Test that only real changes update the version of a graph."""
+        a_graph = DirectedGraph()
+        a_graph.connect(0, 1)
+        version = a_graph.version()
+        a_graph.connect(0, 1)
+        a_graph.add(1)
+        self.assertEqual(a_graph.version(), version)
+        a_graph.connect(1, 0)
+        self.assertNotEqual(a_graph.version(), version)
+
+
+class TestTransitiveReduction(unittest.TestCase):
+    """Test the correctness of graph.TransitiveReduction."""
+
+    def test_empty_graph(self):
+        """Test an empty graph."""
+        reduction = TransitiveReduction(DirectedGraph())
+        self.assertEqual(reduction.redundant_edges(), ())
+
+    def test_shortcuts(self):
+        """Test a linked list with shortcuts."""
+        # Build a linked list 0 -> 1 -> 2 -> 3 with shortcuts.
+        a_graph = DirectedGraph()
+        for j in range(4):
+            for k in range(j + 1, 4):
+                a_graph.connect(j, k)
+        redundant_edges = TransitiveReduction(a_graph).redundant_edges()
+        self.assertEqual(set(redundant_edges), {(0, 2), (0, 3), (1, 3)})
+
+    def test_many_components(self):
+        """Test interleaved components, each of which has shortcuts."""
+        # Component c is a linked list c -> c+n -> c+2n -> c+3n with
+        # shortcuts, so that ids of components are interleaved.
+        n_components = 1000
+        a_graph = DirectedGraph()
+        expected = set()
+        for c in range(n_components):
+            for j in range(4):
+                for k in range(j + 1, 4):
+                    a_graph.connect(c + j * n_components,
+                                    c + k * n_components)
+                    if k > j + 1:
+                        expected.add((c + j * n_components,
+                                      c + k * n_components))
+        redundant_edges = TransitiveReduction(a_graph).redundant_edges()
+        self.assertEqual(len(redundant_edges), len(expected))
+        self.assertEqual(set(redundant_edges), expected)
+
+    def test_random_graph(self):
+        """Test that reachability is kept on a random graph."""
+        a_random = random.Random(0)
+        a_graph = DirectedGraph()
+        for _ in range(200):
+            j = a_random.randrange(40)
+            k = a_random.randrange(40)
+            if j != k:
+                a_graph.connect(max(j, k), min(j, k))
+        expected = ReachabilityIndex(a_graph)
+        pairs = [(j, k) for j in range(40) for k in range(40)]
+        reachable = expected.has_paths(pairs)
+        redundant_edges = TransitiveReduction(a_graph).redundant_edges()
+        for j, k in redundant_edges:
+            a_graph.disconnect(j, k)
+        self.assertEqual(ReachabilityIndex(a_graph).has_paths(pairs),
+                         reachable)
+        # No edge is redundant after reduction.
+        self.assertEqual(TransitiveReduction(a_graph).redundant_edges(), ())
+        for j in range(40):
+            for k in a_graph.neighbors(j):
+                a_graph.disconnect(j, k)
+                self.assertFalse(ReachabilityIndex(a_graph).has_path(j, k))
+                a_graph.connect(j, k)
+
 
 class TestTopologicalSort(unittest.TestCase):
     """Test the correctness of graph.TopologicalSort."""
@@ -193,6 +434,302 @@ class TestTopologicalSort(unittest.TestCase):
         a_checker = Reachability(a_graph)
         self.assertTrue(self._sorted(sorted_vertices, a_checker))
 
+    def test_kahn(self):
+        """Test sorting by Kahn's algorithm."""
+        # Build a linked list:
+        #   0 -> 1 -> 2
+        a_graph = DirectedGraph()
+        a_graph.connect(0, 1)
+        a_graph.connect(1, 2)
+        a_sorter = TopologicalSort(a_graph, algorithm='kahn')
+        self.assertEqual(a_sorter.sort(), (2, 1, 0))
+        # Build a diamond:
+        #     0
+        #    / \
+        #   1   2
+        #    \ /
+        #     3
+        a_graph = DirectedGraph()
+        a_graph.connect(0, 1)
+        a_graph.connect(0, 2)
+        a_graph.connect(1, 3)
+        a_graph.connect(2, 3)
+        sorted_vertices = TopologicalSort(a_graph, algorithm='kahn').sort()
+        self.assertTrue(sorted_vertices in {(3, 2, 1, 0), (3, 1, 2, 0)})
+
+    def test_long_linked_list(self):
+        """Test sorting a linked list deeper than the stack."""
+        # Build a linked list:
+        #   n-1 -> ... -> 1 -> 0
+        n_vertices = 100000
+        a_graph = DirectedGraph()
+        for i in range(1, n_vertices):
+            a_graph.connect(i, i-1)
+        expected = tuple(range(n_vertices))
+        for algorithm in TopologicalSort.ALGORITHMS:
+            a_sorter = TopologicalSort(a_graph, algorithm=algorithm)
+            self.assertEqual(a_sorter.sort(), expected)
+
+    def test_sort_from(self):
+        """Test sorting the vertices reachable from some sources."""
+        # Build a diamond and a linked list:
+        #     0
+        #    / \
+        #   1   2    4 -> 5
+        #    \ /
+        #     3
+        a_graph = DirectedGraph()
+        a_graph.connect(0, 1)
+        a_graph.connect(0, 2)
+        a_graph.connect(1, 3)
+        a_graph.connect(2, 3)
+        a_graph.connect(4, 5)
+        a_sorter = TopologicalSort(a_graph)
+        self.assertEqual(a_sorter.sort_from([1]), (3, 1))
+        self.assertEqual(a_sorter.sort_from([5, 1]), (5, 3, 1))
+        self.assertTrue(a_sorter.sort_from([0])
+                        in {(3, 1, 2, 0), (3, 2, 1, 0)})
+        self.assertEqual(a_sorter.sort_from([]), ())
+        # sort() is not affected.
+        self.assertEqual(len(a_sorter.sort()), 6)
+        with self.assertRaises(AssertionError):
+            a_sorter.sort_from([6])
+
+    def test_cycle_detection(self):
+        """Test sorting a graph containing a cycle."""
+        # Build a cycle:
+        #   0 -> 1 -> 2 -> 0
+        a_graph = DirectedGraph()
+        a_graph.connect(0, 1)
+        a_graph.connect(1, 2)
+        a_graph.connect(2, 0)
+        a_graph.connect(3, 0)
+        for algorithm in TopologicalSort.ALGORITHMS:
+            with self.assertRaises(CycleError) as context:
+                TopologicalSort(a_graph, algorithm=algorithm).sort()
+            self.assertEqual(len(context.exception.cycles), 1)
+            self.assertEqual(set(context.exception.cycles[0]), {0, 1, 2})
+        with self.assertRaises(CycleError):
+            TopologicalSort(a_graph).sort_from([3])
+
+
+class TestLevelSort(unittest.TestCase):
+    """Test the correctness of graph.LevelSort."""
+
+    def test_empty_graph(self):
+        """Test sorting an empty graph."""
+        self.assertEqual(LevelSort(DirectedGraph()).sort(), ())
+
+    def test_diamond(self):
+        """Test sorting a diamond with a shortcut and a lonely vertex."""
+        # Build a diamond:
+        #     0
+        #    /|\
+        #   1 | 2
+        #    \|/
+        #     3   4
+        a_graph = DirectedGraph()
+        a_graph.connect(0, 1)
+        a_graph.connect(0, 2)
+        a_graph.connect(0, 3)
+        a_graph.connect(1, 3)
+        a_graph.connect(2, 3)
+        a_graph.add(4)
+        levels = LevelSort(a_graph).sort()
+        self.assertEqual(len(levels), 3)
+        self.assertEqual(set(levels[0]), {3, 4})
+        self.assertEqual(set(levels[1]), {1, 2})
+        self.assertEqual(levels[2], (0,))
+
+
+class TestCriticalPath(unittest.TestCase):
+    """Test the correctness of graph.CriticalPath."""
+
+    def test_empty_graph(self):
+        """Test analyzing an empty graph."""
+        critical_path = CriticalPath(DirectedGraph(), ())
+        self.assertEqual(critical_path.makespan(), 0.0)
+        self.assertEqual(critical_path.path(), ())
+
+    def test_diamond(self):
+        """Test analyzing a weighted diamond."""
+        # Build a diamond, whose costs are given in brackets:
+        #      0(1)
+        #      / \
+        #   1(2) 2(5)
+        #      \ /
+        #      3(1)
+        a_graph = DirectedGraph()
+        a_graph.connect(0, 1)
+        a_graph.connect(0, 2)
+        a_graph.connect(1, 3)
+        a_graph.connect(2, 3)
+        critical_path = CriticalPath(a_graph, (1.0, 2.0, 5.0, 1.0))
+        self.assertEqual(critical_path.makespan(), 7.0)
+        self.assertEqual(critical_path.path(), (3, 2, 0))
+        self.assertEqual(critical_path.earliest_start(3), 0.0)
+        self.assertEqual(critical_path.earliest_start(1), 1.0)
+        self.assertEqual(critical_path.earliest_start(2), 1.0)
+        self.assertEqual(critical_path.earliest_start(0), 6.0)
+        self.assertEqual(critical_path.latest_start(1), 4.0)
+        self.assertEqual(critical_path.slack(1), 3.0)
+        for i in (0, 2, 3):
+            self.assertEqual(critical_path.slack(i), 0.0)
+
+
+class TestStronglyConnectedComponents(unittest.TestCase):
+    """Test the correctness of graph.StronglyConnectedComponents."""
+
+    def test_acyclic_graph(self):
+        """Test a graph without any cycle."""
+        # Build a linked list:
+        #   0 -> 1 -> 2
+        a_graph = DirectedGraph()
+        a_graph.connect(0, 1)
+        a_graph.connect(1, 2)
+        finder = StronglyConnectedComponents(a_graph)
+        self.assertEqual(finder.components(), ((2,), (1,), (0,)))
+        self.assertEqual(finder.cycles(), ())
+
+    def test_multiple_cycles(self):
+        """Test a graph containing multiple cycles."""
+        # Build two cycles joined by an edge, and a self-loop:
+        #   0 -> 1 -> 0 -> 2 -> 3 -> 4 -> 2    5 -> 5    6
+        a_graph = DirectedGraph()
+        a_graph.connect(0, 1)
+        a_graph.connect(1, 0)
+        a_graph.connect(0, 2)
+        a_graph.connect(2, 3)
+        a_graph.connect(3, 4)
+        a_graph.connect(4, 2)
+        a_graph.connect(5, 5)
+        a_graph.add(6)
+        finder = StronglyConnectedComponents(a_graph)
+        components = [set(component) for component in finder.components()]
+        self.assertEqual(len(components), 4)
+        # The downstream cycle appears first.
+        self.assertTrue(components.index({2, 3, 4}) < components.index({0, 1}))
+        cycles = [set(cycle) for cycle in finder.cycles()]
+        self.assertEqual(len(cycles), 3)
+        for cycle in ({0, 1}, {2, 3, 4}, {5}):
+            self.assertTrue(cycle in cycles)
+
+    def test_long_cycle(self):
+        """Test a cycle longer than the stack."""
+        n_vertices = 100000
+        a_graph = DirectedGraph()
+        for i in range(n_vertices):
+            a_graph.connect(i, (i + 1) % n_vertices)
+        cycles = StronglyConnectedComponents(a_graph).cycles()
+        self.assertEqual(len(cycles), 1)
+        self.assertEqual(len(cycles[0]), n_vertices)
+
+
+class TestDynamicTopologicalSort(unittest.TestCase):
+    """Test the correctness of graph.DynamicTopologicalSort."""
+
+    @staticmethod
+    def _sorted(a_graph, sorted_vertices):
+        position = dict()
+        for p, i in enumerate(sorted_vertices):
+            position[i] = p
+        for j in range(a_graph.n_vertices()):
+            for k in a_graph.neighbors(j):
+                if position[k] > position[j]:
+                    return False
+        return True
+
+    def test_linked_list(self):
+        """Test connecting vertices against the initial order."""
+        a_graph = DirectedGraph()
+        a_graph.add(2)
+        a_sorter = DynamicTopologicalSort(a_graph)
+        self.assertEqual(a_sorter.sort(), (0, 1, 2))
+        # Build a linked list:
+        #   0 -> 1 -> 2
+        a_sorter.connect(0, 1)
+        a_sorter.connect(1, 2)
+        self.assertEqual(a_sorter.sort(), (2, 1, 0))
+        # Implicitly add vertex[3].
+        a_sorter.connect(3, 0)
+        self.assertEqual(a_sorter.sort(), (2, 1, 0, 3))
+
+    def test_adding_first(self):
+        """Test putting new vertices before all the others."""
+        a_graph = DirectedGraph()
+        a_graph.add(0)
+        a_sorter = DynamicTopologicalSort(a_graph)
+        # Build a linked list in the order of a todo list:
+        #   0 -> 1 -> 2 -> 3
+        for j in range(3):
+            a_sorter.add(j + 1, first=True)
+            a_sorter.connect(j, j + 1)
+        self.assertEqual(a_sorter.sort(), (3, 2, 1, 0))
+        # Reorder vertices on both sides of the first appended one.
+        a_sorter.add(4)
+        a_sorter.add(5, first=True)
+        a_sorter.connect(5, 4)
+        a_sorter.connect(3, 5)
+        self.assertEqual(a_sorter.sort(), (4, 5, 3, 2, 1, 0))
+
+    def test_random_adding_first(self):
+        """Test connecting vertices randomly, some of which are put first."""
+        a_random = random.Random(0)
+        a_graph = DirectedGraph()
+        a_sorter = DynamicTopologicalSort(a_graph)
+        for i in range(100):
+            a_sorter.add(i, first=a_random.random() < 0.5)
+        for _ in range(1000):
+            j = a_random.randrange(100)
+            k = a_random.randrange(100)
+            if j != k:
+                a_sorter.connect(max(j, k), min(j, k))
+            self.assertTrue(self._sorted(a_graph, a_sorter.sort()))
+
+    def test_random_graph(self):
+        """Test connecting vertices randomly."""
+        a_random = random.Random(0)
+        a_graph = DirectedGraph()
+        a_sorter = DynamicTopologicalSort(a_graph)
+        for _ in range(1000):
+            j = a_random.randrange(100)
+            k = a_random.randrange(100)
+            # Only connect higher vertices to lower ones to avoid cycles.
+            a_sorter.connect(max(j, k) + 1, min(j, k))
+            self.assertTrue(self._sorted(a_graph, a_sorter.sort()))
+
+    def test_cycle_detection(self):
+        """Test connecting vertices into a cycle."""
+        # Build a linked list:
+        #   0 -> 1 -> 2
+        a_graph = DirectedGraph()
+        a_sorter = DynamicTopologicalSort(a_graph)
+        a_sorter.connect(0, 1)
+        a_sorter.connect(1, 2)
+        with self.assertRaises(CycleError) as context:
+            a_sorter.connect(2, 0)
+        self.assertEqual(context.exception.cycles, ((2, 1, 0),))
+        with self.assertRaises(CycleError) as context:
+            a_sorter.connect(1, 1)
+        self.assertEqual(context.exception.cycles, ((1,),))
+        # The graph is unchanged.
+        self.assertEqual(a_graph.neighbors(2), set())
+        self.assertEqual(a_sorter.sort(), (2, 1, 0))
+
+    def test_disconnect(self):
+        """Test disconnecting vertices."""
+        # Build a linked list:
+        #   0 -> 1 -> 2
+        a_graph = DirectedGraph()
+        a_sorter = DynamicTopologicalSort(a_graph)
+        a_sorter.connect(0, 1)
+        a_sorter.connect(1, 2)
+        a_sorter.disconnect(1, 2)
+        self.assertEqual(a_graph.neighbors(1), set())
+        # The reversed edge no longer makes a cycle.
+        a_sorter.connect(2, 1)
+        self.assertTrue(self._sorted(a_graph, a_sorter.sort()))
+
 
 class TestUnionFind(unittest.TestCase):
     """Test the correctness of graph.UnionFind."""
@@ -261,6 +798,18 @@ class TestUnionFind(unittest.TestCase):
         self.assertEqual(a_graph.connected(0, 2), False)
         self.assertEqual(a_graph.connected(2, 0), False)
 
+    def test_connect_many(self):
+        """Test connect_many()."""
+        # Create { {0}, {1}, {2}, {3}, {4} }.
+        a_graph = UnionFind()
+        a_graph.add(4)
+        # Connect them into { {0, 1, 2}, {3, 4} }.
+        a_graph.connect_many([(0, 1), (3, 4), (2, 1), (0, 2)])
+        self.assertTrue(a_graph.connected(0, 2))
+        self.assertTrue(a_graph.connected(1, 2))
+        self.assertTrue(a_graph.connected(3, 4))
+        self.assertFalse(a_graph.connected(2, 3))
+
     def test_root(self):
         """Test root()."""
         # Create { {0}, {1, 2} }.
@@ -274,6 +823,109 @@ class TestUnionFind(unittest.TestCase):
         with self.assertRaises(AssertionError):
             a_graph.root(3)
 
+    def test_n_compressions(self):
+        """Test counting steps compressing paths."""
+        # Create a tree 3 -> 2 -> 1 -> 0.
+        a_graph = UnionFind.from_arrays([0, 0, 1, 2], [4, 3, 2, 1])
+        self.assertEqual(a_graph.n_compressions(), 0)
+        # 3 -> 1 -> 0 in two steps.
+        self.assertEqual(a_graph.root(3), 0)
+        self.assertEqual(a_graph.n_compressions(), 2)
+        # 3 -> 0 in one step.
+        self.assertEqual(a_graph.root(3), 0)
+        self.assertEqual(a_graph.n_compressions(), 3)
+        # 0 is a root.
+        self.assertEqual(a_graph.root(0), 0)
+        self.assertEqual(a_graph.n_compressions(), 3)
+        # Steps in connect_many() are counted as well.
+        a_graph = UnionFind.from_arrays([0, 0, 1, 2], [4, 3, 2, 1])
+        a_graph.connect_many([(3, 0)])
+        self.assertEqual(a_graph.n_compressions(), 2)
+
+
+    def test_roots(self):
+        """Test flattening all trees by roots()."""
+        for a_union in (UnionFind(), CompactUnionFind()):
+            # Create { {0, 1, 2, 3}, {4}, {5, 6} } by a linked list.
+            a_union.connect_many([])
+            a_union.add(6)
+            a_union.connect_many([(1, 0), (2, 1), (3, 2), (6, 5)])
+            # Connecting the same component does not change the size.
+            a_union.connect(3, 0)
+            self.assertEqual(a_union.arrays()[1][a_union.root(0)], 4)
+            roots = a_union.roots()
+            self.assertEqual(len(roots), 7)
+            self.assertEqual(len({roots[i] for i in range(4)}), 1)
+            self.assertEqual(roots[4], 4)
+            self.assertEqual(roots[5], roots[6])
+            self.assertEqual(len(set(roots)), 3)
+            # All trees are flat.
+            self.assertEqual(list(a_union.arrays()[0]), list(roots))
+            for i in range(7):
+                self.assertEqual(a_union.root(i), roots[i])
+
+
+class TestDynamicComponents(unittest.TestCase):
+    """Test the correctness of graph.DynamicComponents."""
+
+    @staticmethod
+    def _brute_force_connected(edges, j, k):
+        found = {j}
+        stack = [j]
+        while stack:
+            i = stack.pop()
+            for (a, b) in edges:
+                for (x, y) in ((a, b), (b, a)):
+                    if x == i and y not in found:
+                        found.add(y)
+                        stack.append(y)
+        return k in found
+
+    def test_linked_list(self):
+        """Test splitting a linked list."""
+        # Build a linked list:
+        #   0 - 1 - 2 - 3
+        components = DynamicComponents()
+        components.connect_many([(0, 1), (1, 2), (2, 3)])
+        self.assertEqual(components.n_vertices(), 4)
+        self.assertTrue(components.connected(0, 3))
+        self.assertEqual(components.neighbors(1), {0, 2})
+        # Split it into:
+        #   0 - 1   2 - 3
+        components.disconnect(1, 2)
+        self.assertTrue(components.connected(0, 1))
+        self.assertTrue(components.connected(2, 3))
+        self.assertFalse(components.connected(1, 2))
+        self.assertNotEqual(components.root(0), components.root(3))
+        # Parallel edges are counted.
+        components.connect(0, 1)
+        components.disconnect(1, 0)
+        self.assertTrue(components.connected(0, 1))
+        components.disconnect(0, 1)
+        self.assertFalse(components.connected(0, 1))
+        with self.assertRaises(AssertionError):
+            components.root(4)
+        self.assertEqual(list(components.roots()),
+                         [components.root(i) for i in range(4)])
+
+    def test_random_graph(self):
+        """Compare with brute force on a random graph."""
+        a_random = random.Random(0)
+        a_graph = DirectedGraph()
+        for _ in range(40):
+            a_graph.connect(a_random.randrange(20), a_random.randrange(20))
+        components = DynamicComponents.from_graph(a_graph)
+        edges = [(j, k) for j in range(20) for k in a_graph.neighbors(j)]
+        a_random.shuffle(edges)
+        while edges:
+            j, k = edges.pop()
+            components.disconnect(j, k)
+            for a in range(20):
+                for b in range(20):
+                    self.assertEqual(
+                        components.connected(a, b),
+                        self._brute_force_connected(edges, a, b))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,32 +1,177 @@
 #!/usr/bin/env python3
 """Define Scheduler."""
 
+from array import array
+from collections import Counter
+from collections import defaultdict
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+import contextlib
+import functools
+import heapq
+import mmap
+import os
+import struct
+import time
+
+from graph import CompactUnionFind
+from graph import CriticalPath
+from graph import CycleError
 from graph import DirectedGraph
+from graph import DynamicComponents
+from graph import DynamicTopologicalSort
+from graph import FrozenGraph
+from graph import LevelSort
+from graph import ReachabilityIndex
+from graph import StronglyConnectedComponents
 from graph import TopologicalSort
+from graph import TransitiveReduction
 from graph import UnionFind
 
+WaveStatistics = namedtuple('WaveStatistics',
+                            ('depth', 'max_width', 'average_parallelism'))
+
+
+TaskTiming = namedtuple('TaskTiming',
+                        ('earliest_start', 'latest_start', 'slack'))
+
+
+def _naming_cycles(method):
+    """Replace task ids by tasks in a CycleError raised by method."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        except CycleError as error:
+            raise CycleError(self._to_tasks(error.cycles)) from None
+    return wrapper
+
+
+def wave_statistics(waves):
+    """Return the depth, maximum width and average width of waves."""
+    depth = len(waves)
+    n_tasks = sum(len(wave) for wave in waves)
+    max_width = max((len(wave) for wave in waves), default=0)
+    average_parallelism = n_tasks / depth if depth else 0.0
+    return WaveStatistics(depth, max_width, average_parallelism)
+
+
+# The header of a snapshot consists of a magic number, a byte-order mark,
+# the numbers of tasks and edges, and the length of the encoded task names.
+_SNAPSHOT_HEADER = struct.Struct('=8sQQQQ')
+_SNAPSHOT_MAGIC = b'miniSch1'
+_SNAPSHOT_BYTE_ORDER = 0x0102030405060708
+
+# Mark a missing result in a cache.
+_MISSING = object()
+
+# Mark a removed task.
+_REMOVED = object()
+
+# The CPU slots and the memory needed by a task by default.
+_DEFAULT_RESOURCES = (1, 0)
 
-class Scheduler:
-    """A scheduler supporting O(1) adding and O(N) scheduling."""
+
+class _Profile:
+    """Counters and durations of phases of a Scheduler."""
 
     def __init__(self):
+        self.counters = Counter()
+        self.seconds = defaultdict(float)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Add the time spent in the with-block to seconds[name]."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+
+
+class _NoPhase:
+    """A context doing nothing, like contextlib.nullcontext in Python 3.7."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+
+# Shared by all phases of a Scheduler not being profiled.
+_NO_PHASE = _NoPhase()
+
+
+class Scheduler:
+    """A scheduler supporting O(1) adding and O(N) scheduling.
+
+    Removing is also supported.  On the first removing, the CompactUnionFind is
+    replaced by a DynamicComponents, which keeps independent groups up to
+    date without rebuilding.  The id of a removed task is not reused.
+
+    In the incremental mode, the topological order is kept up to date on
+    each adding, so scheduling needs no sorting, at the cost of storing
+    the reversed graph.  Adding a prerequisite that makes a cycle fails
+    immediately instead of at scheduling.
+
+    In the profiling mode, counters and durations of phases are recorded
+    and returned by stats().  Otherwise, only a check per phase is paid.
+    """
+
+    EXECUTORS = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+
+    def __init__(self, incremental=False, profile=False):
         self._task_to_id = dict()
         self._id_to_task = list()
         self._graph = DirectedGraph()
-        self._union = UnionFind()
+        self._union = CompactUnionFind()
+        # _cost[i] is the estimated cost of task[i].
+        self._cost = array('d')
+        # _resources[i] is (cpus, memory) needed by task[i], if not default.
+        self._resources = dict()
+        self._n_removed = 0
+        self._reachability = None
+        self._sorter = None
+        if incremental:
+            self._sorter = DynamicTopologicalSort(self._graph)
+        self._profile = _Profile() if profile else None
 
-    def add_a_task(self, task):
-        """Add a new task.
+    def add_a_task(self, task, cost=None):
+        """Add a new task with an estimated cost, which is 1.0 by default.
 
-        Do nothing, if the task has already been added.
+        Only update the cost, if the task has already been added.
         """
         if task not in self._task_to_id:
-            i_task = self.n_tasks()
+            assert not self.frozen(), 'Cannot add tasks after freezing.'
+            i_task = len(self._id_to_task)
             self._task_to_id[task] = i_task
             self._id_to_task.append(task)
-        assert len(self._id_to_task) == len(self._task_to_id)
+            if self._sorter is not None:
+                self._sorter.add(i_task)
+            else:
+                self._graph.add(i_task)
+            self._union.add(i_task)
+            self._cost.append(1.0)
+        if cost is not None:
+            assert cost >= 0, 'Cost should be non-negative.'
+            self._cost[self._task_to_id[task]] = cost
+        assert len(self._id_to_task) == self.n_tasks() + self._n_removed
         assert task == self._id_to_task[self._task_to_id[task]]
 
+    def set_resources(self, task, cpus=1, memory=0):
+        """Declare the CPU slots and the memory needed to run a task.
+
+        By default, a task needs one CPU slot and no memory.  Resources are
+        respected by run(), but not saved into snapshots.
+        """
+        assert task in self._task_to_id, "{0!r} is not a task.".format(task)
+        assert cpus >= 0 and memory >= 0, 'Resources should be non-negative.'
+        self._resources[self._task_to_id[task]] = (cpus, memory)
+
     def add_tasks(self, tasks):
         """Add multiple tasks."""
         for task in tasks:
@@ -36,56 +181,621 @@ class Scheduler:
         """Return the number of tasks being added."""
         return len(self._task_to_id)
 
+    @_naming_cycles
     def add_a_prerequisite(self, task, prerequisite):
         """Add a prerequisite for a task.
 
         Automatically add a new task, if any of the two is new.
         Do nothing, if the prerequisite has already been added.
+        Raise a CycleError in the incremental mode, if a cycle is made.
         """
+        assert not self.frozen(), 'Cannot add prerequisites after freezing.'
         self.add_a_task(task)
+        if self._sorter is not None and prerequisite not in self._task_to_id:
+            # Put a new prerequisite before all tasks, so that connecting
+            # it needs no reordering.
+            self._sorter.add(len(self._id_to_task), first=True)
         self.add_a_task(prerequisite)
         i_task = self._task_to_id[task]
         i_prerequisite = self._task_to_id[prerequisite]
-        self._graph.connect(i_task, i_prerequisite)
-        self._union.connect(i_task, i_prerequisite)
+        # A DynamicComponents counts edges, so only new ones are connected.
+        is_new = i_prerequisite not in self._graph.iter_neighbors(i_task)
+        if self._sorter is not None:
+            self._sorter.connect(i_task, i_prerequisite)
+        else:
+            self._graph.connect(i_task, i_prerequisite)
+        if is_new:
+            self._union.connect(i_task, i_prerequisite)
+            if self._profile is not None:
+                self._profile.counters['edges_added'] += 1
 
     def add_prerequisites(self, task, prerequisites):
         """Add multiple prerequisites for a task."""
         for prerequisite in prerequisites:
             self.add_a_prerequisite(task, prerequisite)
 
+    def add_edges(self, pairs):
+        """Add a prerequisite for each (task, prerequisite) in pairs.
+
+        Equivalent to calling add_a_prerequisite() for each pair, but much
+        faster for a large number of pairs.  Except in the incremental
+        mode, nothing is added if any pair is invalid.
+        """
+        if self._sorter is not None:
+            for task, prerequisite in pairs:
+                self.add_a_prerequisite(task, prerequisite)
+            return
+        assert not self.frozen(), 'Cannot add prerequisites after freezing.'
+        task_to_id = self._task_to_id
+        id_to_task = self._id_to_task
+        n_tasks_before = len(id_to_task)
+        i_pairs = list()
+        with self._phase('intern'):
+            try:
+                for task, prerequisite in pairs:
+                    i_task = task_to_id.get(task)
+                    if i_task is None:
+                        i_task = task_to_id[task] = len(id_to_task)
+                        id_to_task.append(task)
+                    i_prerequisite = task_to_id.get(prerequisite)
+                    if i_prerequisite is None:
+                        i_prerequisite = len(id_to_task)
+                        task_to_id[prerequisite] = i_prerequisite
+                        id_to_task.append(prerequisite)
+                    i_pairs.append((i_task, i_prerequisite))
+            except BaseException:
+                # Forget the new tasks, so that nothing is added.
+                for task in id_to_task[n_tasks_before:]:
+                    del task_to_id[task]
+                del id_to_task[n_tasks_before:]
+                raise
+        with self._phase('connect'):
+            n_tasks = len(id_to_task)
+            if n_tasks > n_tasks_before:
+                self._graph.add(n_tasks - 1)
+                self._union.add(n_tasks - 1)
+                self._cost.extend([1.0] * (n_tasks - n_tasks_before))
+            # A DynamicComponents counts edges, so only new ones are
+            # connected.
+            iter_neighbors = self._graph.iter_neighbors
+            i_pairs = [(i_task, i_prerequisite)
+                       for i_task, i_prerequisite in dict.fromkeys(i_pairs)
+                       if i_prerequisite not in iter_neighbors(i_task)]
+            self._graph.connect_many(i_pairs)
+            self._union.connect_many(i_pairs)
+        if self._profile is not None:
+            self._profile.counters['edges_added'] += len(i_pairs)
+
+    def remove_a_prerequisite(self, task, prerequisite):
+        """Remove a prerequisite of a task.
+
+        Do nothing, if the prerequisite has not been added.
+        """
+        assert not self.frozen(), 'Cannot remove prerequisites after freezing.'
+        assert task in self._task_to_id, "{0!r} is not a task.".format(task)
+        assert prerequisite in self._task_to_id, \
+            "{0!r} is not a task.".format(prerequisite)
+        self._disconnect(self._task_to_id[task],
+                         self._task_to_id[prerequisite])
+
+    def remove_a_task(self, task):
+        """Remove a task and all the prerequisites involving it."""
+        assert not self.frozen(), 'Cannot remove tasks after freezing.'
+        assert task in self._task_to_id, "{0!r} is not a task.".format(task)
+        i_task = self._task_to_id.pop(task)
+        self._disconnect(i_task, i_task)
+        for i_other in self._dynamic_union().neighbors(i_task):
+            self._disconnect(i_task, i_other)
+            self._disconnect(i_other, i_task)
+        self._id_to_task[i_task] = _REMOVED
+        self._cost[i_task] = 0.0
+        self._resources.pop(i_task, None)
+        self._n_removed += 1
+
+    @_naming_cycles
+    def reduce(self):
+        """Remove prerequisites implied by others and return their number.
+
+        For example, if C depends on A and B, and B depends on A, then the
+        prerequisite A of C is removed.  Independent groups are unchanged.
+        """
+        assert not self.frozen(), 'Cannot remove prerequisites after freezing.'
+        redundant_edges = TransitiveReduction(self._graph).redundant_edges()
+        for i_task, i_prerequisite in redundant_edges:
+            if self._sorter is not None:
+                self._sorter.disconnect(i_task, i_prerequisite)
+            else:
+                self._graph.disconnect(i_task, i_prerequisite)
+            if isinstance(self._union, DynamicComponents):
+                self._union.disconnect(i_task, i_prerequisite)
+        return len(redundant_edges)
+
+    def load_todo_list(self, lines, batch_size=65536):
+        """Add tasks and prerequisites given by lines of a todo list.
+
+        Each line gives a task followed by its prerequisites, separated by
+        whitespaces.  Empty lines and lines starting with '#' are skipped.
+        Prerequisites are added in batches of batch_size by add_edges().
+        """
+        lines = iter(lines)
+        while True:
+            with self._phase('parse'):
+                batch = self._parse_todo_list(lines, batch_size)
+            self.add_edges(batch)
+            if len(batch) < batch_size:
+                break
+
+    def depends_on(self, task, prerequisite):
+        """Return True if task depends on prerequisite, maybe indirectly.
+
+        The first query builds an index of O(N) size in O(N) time, which
+        answers most following queries in O(1) time until the next adding.
+        """
+        return self.depends_on_many(((task, prerequisite),))[0]
+
+    @_naming_cycles
+    def depends_on_many(self, pairs):
+        """Return a tuple of depends_on(task, prerequisite) for each pair."""
+        if self._reachability is None:
+            self._reachability = ReachabilityIndex(self._graph)
+        has_path = self._reachability.has_path
+        answers = list()
+        for task, prerequisite in pairs:
+            if task in self._task_to_id and prerequisite in self._task_to_id:
+                answers.append(has_path(self._task_to_id[task],
+                                        self._task_to_id[prerequisite]))
+            else:
+                answers.append(False)
+        return tuple(answers)
+
+    def freeze(self):
+        """Compile the dependency graph into a compact read-only form.
+
+        Scheduling is unaffected, but no task or prerequisite can be added
+        afterwards.
+        """
+        if not self.frozen():
+            self._graph = self._graph.freeze()
+            self._reachability = None
+
+    def frozen(self):
+        """Return True if this scheduler has been frozen."""
+        return isinstance(self._graph, FrozenGraph)
+
+    def save_snapshot(self, path):
+        """Save the state of this scheduler into a binary file.
+
+        Tasks must be str's without NUL characters.  The file consists of
+        the header, the task names, and the arrays of the frozen graph, the
+        union and the costs, which can be mapped back by load_snapshot().
+        """
+        if isinstance(self._union, DynamicComponents):
+            self._compacted().save_snapshot(path)
+            return
+        names = list()
+        for task in self._id_to_task:
+            assert isinstance(task, str) and '\0' not in task, \
+                'Cannot save {0!r} in a snapshot.'.format(task)
+            names.append(task)
+        names = '\0'.join(names).encode()
+        graph = self._graph if self.frozen() else self._graph.freeze()
+        offset, target = graph.arrays()
+        parent, size = self._union.arrays()
+        with open(path, 'wb') as file:
+            file.write(_SNAPSHOT_HEADER.pack(
+                _SNAPSHOT_MAGIC, _SNAPSHOT_BYTE_ORDER, self.n_tasks(),
+                graph.n_edges(), len(names)))
+            file.write(names)
+            # Align the arrays to 8 bytes.
+            file.write(bytes(-len(names) % 8))
+            for an_array in (offset, target, parent, size):
+                array('q', an_array).tofile(file)
+            array('d', self._cost).tofile(file)
+
+    @classmethod
+    def load_snapshot(cls, path):
+        """Return a frozen scheduler loaded from a file by save_snapshot().
+
+        The arrays are memory-mapped instead of being parsed, and pages are
+        copied only when they are written.
+        """
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, byte_order, n_tasks, n_edges, n_bytes = \
+            _SNAPSHOT_HEADER.unpack_from(buffer)
+        assert magic == _SNAPSHOT_MAGIC, 'Not a snapshot of Scheduler.'
+        assert byte_order == _SNAPSHOT_BYTE_ORDER, 'Wrong byte order.'
+        begin = _SNAPSHOT_HEADER.size
+        names = buffer[begin:begin+n_bytes].decode()
+        begin += n_bytes + (-n_bytes % 8)
+        views = list()
+        for length, typecode in ((n_tasks + 1, 'q'), (n_edges, 'q'),
+                                 (n_tasks, 'q'), (n_tasks, 'q'),
+                                 (n_tasks, 'd')):
+            end = begin + length * 8
+            views.append(memoryview(buffer)[begin:end].cast(typecode))
+            begin = end
+        assert begin == len(buffer), 'Wrong size of snapshot.'
+        a_scheduler = cls()
+        a_scheduler._id_to_task = names.split('\0') if n_tasks else list()
+        a_scheduler._task_to_id = dict(
+            zip(a_scheduler._id_to_task, range(n_tasks)))
+        a_scheduler._graph = FrozenGraph(views[0], views[1])
+        a_scheduler._union = CompactUnionFind.from_arrays(views[2], views[3])
+        a_scheduler._cost = views[4]
+        return a_scheduler
+
+    def stats(self):
+        """Return a dict of counters and a dict of seconds spent in phases.
+
+        Counters include the numbers of new edges added, tasks sorted, and
+        steps compressing paths in the union.  Phases include
+        'parse', 'intern', 'connect', 'sort' and 'group'.
+        """
+        assert self._profile is not None, 'Profiling is not enabled.'
+        stats = dict.fromkeys(('edges_added', 'tasks_sorted'), 0)
+        stats.update(self._profile.counters)
+        stats['root_compressions'] = 0
+        if isinstance(self._union, UnionFind):
+            stats['root_compressions'] = self._union.n_compressions()
+        stats['seconds'] = dict(self._profile.seconds)
+        return stats
+
+    def find_cycles(self):
+        """Return a tuple of cycles, each of which is a tuple of tasks.
+
+        Each cycle is actually a strongly connected component, so every
+        cycle in the dependency graph is contained by one of them.
+        """
+        components = StronglyConnectedComponents(self._graph)
+        return self._to_tasks(components.cycles())
+
+    @_naming_cycles
     def schedule(self):
-        """Return the tasks in topologically sorted order."""
-        sorted_tasks = TopologicalSort(self._graph).sort()
+        """Return the tasks in topologically sorted order.
+
+        Raise a CycleError containing all cycles, if there is any.
+        """
+        return self._to_scheduled_tasks(self._sort(), every_task=True)
+
+    @_naming_cycles
+    def schedule_for(self, targets):
+        """Return the targets and their prerequisites in sorted order.
+
+        The result is grouped as that of schedule(), but only tasks needed
+        by the targets are visited.
+        """
+        sources = list()
+        for task in targets:
+            assert task in self._task_to_id, \
+                "{0!r} is not a task.".format(task)
+            sources.append(self._task_to_id[task])
+        sorted_tasks = TopologicalSort(self._graph).sort_from(sources)
+        return self._to_scheduled_tasks(sorted_tasks)
+
+    @_naming_cycles
+    def schedule_in_waves(self):
+        """Return the tasks grouped into waves in topologically sorted order.
+
+        Each wave is a tuple of tasks whose prerequisites are all in earlier
+        waves, so tasks in the same wave can run in parallel.
+        """
+        sorted_tasks = self._sort()
+        with self._phase('group'):
+            levels = LevelSort(self._graph, sorted_tasks).sort()
+            waves = (self._to_live_tasks(level) for level in levels)
+            return tuple(wave for wave in waves if wave)
+
+    @_naming_cycles
+    def critical_path(self):
+        """Return the tasks on a longest weighted path in sorted order."""
+        critical_path = self._critical_path()
+        return self._to_live_tasks(critical_path.path())
+
+    @_naming_cycles
+    def makespan(self):
+        """Return the total cost of the tasks on a critical path."""
+        return self._critical_path().makespan()
+
+    @_naming_cycles
+    def timing(self):
+        """Return a dict mapping each task to its TaskTiming.
+
+        A task on a critical path has zero slack, while a task with positive
+        slack can be delayed that much without delaying the whole schedule.
+        """
+        critical_path = self._critical_path()
+        timing = dict()
+        for i_task, task in enumerate(self._id_to_task):
+            if task is _REMOVED:
+                continue
+            timing[task] = TaskTiming(critical_path.earliest_start(i_task),
+                                      critical_path.latest_start(i_task),
+                                      critical_path.slack(i_task))
+        return timing
+
+    @_naming_cycles
+    def run(self, callable_map, max_workers=None, mode='thread',
+            cache=None, inputs=None, cpu_slots=None, memory_budget=None):
+        """Run the tasks concurrently and return their results in a dict.
+
+        callable_map[task] is called without arguments, as soon as all the
+        prerequisites of the task have returned.  A task not in callable_map
+        returns None immediately.  The calls are dispatched to a pool of
+        threads or processes, depending on mode.  If a call raises, the
+        exception propagates after the running calls have returned.
+
+        When more tasks are ready than workers are idle, the ones with the
+        earliest latest start times, i.e. those on or near a critical path,
+        are dispatched first.
+
+        If a cache.BuildCache is given, results are stored in it by keys
+        depending on the input files of each task, given by inputs[task],
+        and the keys of its prerequisites.  A task is only called, if its
+        key is not in the cache, i.e. it is downstream of a change.
+
+        If cpu_slots or memory_budget is given, the resources declared by
+        set_resources() of the running calls never exceed them.  Ready tasks
+        are packed first-fit in the order of priority, so a heavy task does
+        not block lighter ones behind it.  Raise a ValueError, if a task
+        needs more than the whole budget.
+        """
+        assert mode in Scheduler.EXECUTORS, "Unknown mode '{0}'.".format(mode)
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        free_cpus = float('inf') if cpu_slots is None else cpu_slots
+        free_memory = float('inf') if memory_budget is None else memory_budget
+        sorted_tasks = self._sort()
+        critical_path = CriticalPath(self._graph, self._cost, sorted_tasks)
+        priority = critical_path.latest_start
+        # Tasks with default resources are checked as well.
+        for i_task in sorted_tasks:
+            task = self._id_to_task[i_task]
+            if task is _REMOVED or task not in callable_map:
+                continue
+            cpus, memory = self._resources.get(i_task, _DEFAULT_RESOURCES)
+            if cpus > free_cpus or memory > free_memory:
+                raise ValueError(
+                    '{0!r} needs more than the budgets.'.format(task))
+        # n_waiting[i] is the number of unfinished prerequisites of task[i].
+        n_waiting = array('l', [0]) * len(sorted_tasks)
+        # dependents[k] is the list of tasks having task[k] as a prerequisite.
+        dependents = [list() for _ in sorted_tasks]
+        for i_task in sorted_tasks:
+            for i_prerequisite in self._graph.iter_neighbors(i_task):
+                n_waiting[i_task] += 1
+                dependents[i_prerequisite].append(i_task)
+        # ready is a heap of (priority, task id) pairs.
+        ready = [(priority(i), i) for i in sorted_tasks if n_waiting[i] == 0]
+        heapq.heapify(ready)
+        if cache is not None:
+            keys = self._cache_keys(sorted_tasks, cache, inputs or dict())
+        results = dict()
+        with Scheduler.EXECUTORS[mode](max_workers) as executor:
+            running = dict()
+            while ready or running:
+                # Ready tasks not fitting into the free resources.
+                deferred = list()
+                while ready and len(running) < max_workers:
+                    item = heapq.heappop(ready)
+                    i_task = item[1]
+                    task = self._id_to_task[i_task]
+                    result = _MISSING
+                    if task not in callable_map:
+                        result = None
+                    elif cache is not None:
+                        result = cache.get(keys[i_task], _MISSING)
+                    if result is not _MISSING:
+                        results[task] = result
+                        self._release(dependents[i_task], n_waiting, ready,
+                                      priority)
+                        continue
+                    cpus, memory = self._resources.get(i_task,
+                                                       _DEFAULT_RESOURCES)
+                    if cpus > free_cpus or memory > free_memory:
+                        deferred.append(item)
+                        continue
+                    free_cpus -= cpus
+                    free_memory -= memory
+                    future = executor.submit(callable_map[task])
+                    running[future] = i_task
+                for item in deferred:
+                    heapq.heappush(ready, item)
+                if not running:
+                    # Unreachable after the check above, but never return
+                    # partial results silently.
+                    if ready:
+                        raise ValueError('No ready task fits the budgets.')
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i_task = running.pop(future)
+                    cpus, memory = self._resources.get(i_task,
+                                                       _DEFAULT_RESOURCES)
+                    free_cpus += cpus
+                    free_memory += memory
+                    results[self._id_to_task[i_task]] = future.result()
+                    if cache is not None:
+                        cache.put(keys[i_task], future.result())
+                    self._release(dependents[i_task], n_waiting, ready,
+                                  priority)
+        results.pop(_REMOVED, None)
+        return results
+
+    @staticmethod
+    def _release(dependents, n_waiting, ready, priority):
+        # Mark a prerequisite finished for each dependent.
+        for i_task in dependents:
+            n_waiting[i_task] -= 1
+            if n_waiting[i_task] == 0:
+                heapq.heappush(ready, (priority(i_task), i_task))
+
+    def _disconnect(self, i_task, i_prerequisite):
+        if not self._graph.connected(i_task, i_prerequisite):
+            return
+        # Build the components before the edge is removed from the graph.
+        union = self._dynamic_union()
+        if self._sorter is not None:
+            self._sorter.disconnect(i_task, i_prerequisite)
+        else:
+            self._graph.disconnect(i_task, i_prerequisite)
+        union.disconnect(i_task, i_prerequisite)
+
+    def _critical_path(self):
+        return CriticalPath(self._graph, self._cost, self._sort())
+
+    def _dynamic_union(self):
+        if not isinstance(self._union, DynamicComponents):
+            self._union = DynamicComponents.from_graph(self._graph)
+        return self._union
+
+    def _cache_keys(self, sorted_tasks, cache, inputs):
+        # Prerequisites are sorted before their dependents.
+        keys = [None] * len(sorted_tasks)
+        for i_task in sorted_tasks:
+            task = self._id_to_task[i_task]
+            keys[i_task] = cache.key(
+                task, inputs.get(task, ()),
+                [keys[k] for k in self._graph.iter_neighbors(i_task)])
+        return keys
+
+    def _phase(self, name):
+        if self._profile is None:
+            return _NO_PHASE
+        return self._profile.phase(name)
+
+    def _parse_todo_list(self, lines, batch_size):
+        # Return a batch of pairs parsed from lines, adding lone tasks.
+        batch = list()
+        for line in lines:
+            words = line.split()
+            if not words or words[0][0] == '#':
+                continue
+            task = words[0]
+            if len(words) == 1:
+                self.add_a_task(task)
+            for prerequisite in words[1:]:
+                batch.append((task, prerequisite))
+            if len(batch) >= batch_size:
+                break
+        return batch
+
+    def _sort(self):
+        with self._phase('sort'):
+            if self._sorter is not None:
+                sorted_tasks = self._sorter.sort()
+            else:
+                sorted_tasks = TopologicalSort(self._graph).sort()
+        if self._profile is not None:
+            self._profile.counters['tasks_sorted'] += len(sorted_tasks)
+        return sorted_tasks
+
+    def _to_tasks(self, cycles):
+        return tuple(tuple(self._id_to_task[i_task] for i_task in cycle)
+                     for cycle in cycles)
+
+    def _to_scheduled_tasks(self, sorted_tasks, every_task=False):
         # Make immutable copies.
         scheduled_tasks = set()
-        for a_component in self._to_components(sorted_tasks):
+        for a_component in self._to_components(sorted_tasks, every_task):
             scheduled_tasks.add(tuple(a_component))
         return scheduled_tasks
 
-    def _to_components(self, sorted_tasks):
+    def _to_live_tasks(self, i_tasks):
+        tasks = (self._id_to_task[i_task] for i_task in i_tasks)
+        return tuple(task for task in tasks if task is not _REMOVED)
+
+    def _to_components(self, sorted_tasks, every_task=False):
+        # Sweeping all trees by roots() costs O(V), which only pays off if
+        # every task is grouped.  Otherwise, the cost is kept proportional
+        # to the number of sorted tasks by calling root() for each of them.
         root_to_component = dict()
-        for i_task in sorted_tasks:
-            i_root = self._union.root(i_task)
-            if i_root not in root_to_component:
-                root_to_component[i_root] = list()
-            task = self._id_to_task[i_task]
-            root_to_component[i_root].append(task)
+        with self._phase('group'):
+            if every_task:
+                root = self._union.roots().__getitem__
+            else:
+                root = self._union.root
+            for i_task in sorted_tasks:
+                task = self._id_to_task[i_task]
+                if task is _REMOVED:
+                    continue
+                i_root = root(i_task)
+                if i_root not in root_to_component:
+                    root_to_component[i_root] = list()
+                root_to_component[i_root].append(task)
         return root_to_component.values()
 
+    def _compacted(self):
+        # Return a copy without removed tasks, so that ids are consecutive.
+        a_scheduler = Scheduler()
+        for i_task, task in enumerate(self._id_to_task):
+            if task is not _REMOVED:
+                a_scheduler.add_a_task(task, self._cost[i_task])
+                if i_task in self._resources:
+                    a_scheduler.set_resources(task, *self._resources[i_task])
+        a_scheduler.add_edges(
+            (self._id_to_task[i_task], self._id_to_task[i_prerequisite])
+            for i_task in range(len(self._id_to_task))
+            for i_prerequisite in self._graph.iter_neighbors(i_task))
+        return a_scheduler
+
 if __name__ == "__main__":
+    import argparse
     import sys
-    A_SCHEDULER = Scheduler()
-    for line in sys.stdin:
-        if line[0] != '#':
-            task_and_prerequisites = line.split()
-            A_SCHEDULER.add_prerequisites(
-                task_and_prerequisites[0],
-                task_and_prerequisites[1:]
-            )
-    i = 0
-    for one_component_of_scheduled_tasks in A_SCHEDULER.schedule():
-        i += 1
-        print('Independent Task Group {0}:'.format(i))
-        for a_task in one_component_of_scheduled_tasks:
-            print('  ' + a_task)
+    PARSER = argparse.ArgumentParser(
+        description='Schedule tasks read from stdin.')
+    PARSER.add_argument('-w', '--waves', action='store_true',
+                        help='group tasks into waves of parallel tasks')
+    PARSER.add_argument('-l', '--load', metavar='SNAPSHOT',
+                        help='load tasks from a snapshot instead of stdin')
+    PARSER.add_argument('-s', '--save', metavar='SNAPSHOT',
+                        help='save tasks into a snapshot')
+    PARSER.add_argument('-r', '--reduce', action='store_true',
+                        help='remove prerequisites implied by others')
+    PARSER.add_argument('-p', '--profile', action='store_true',
+                        help='print counters and durations of phases')
+    ARGS = PARSER.parse_args()
+    if ARGS.load:
+        assert not ARGS.profile, 'Cannot profile a loaded snapshot.'
+        A_SCHEDULER = Scheduler.load_snapshot(ARGS.load)
+    else:
+        A_SCHEDULER = Scheduler(profile=ARGS.profile)
+        A_SCHEDULER.load_todo_list(sys.stdin)
+    if ARGS.reduce:
+        assert not ARGS.load, 'Cannot reduce a loaded snapshot.'
+        try:
+            A_SCHEDULER.reduce()
+        except CycleError as error:
+            sys.exit(str(error))
+    if ARGS.save:
+        A_SCHEDULER.save_snapshot(ARGS.save)
+    try:
+        if ARGS.waves:
+            WAVES = A_SCHEDULER.schedule_in_waves()
+        else:
+            COMPONENTS = A_SCHEDULER.schedule()
+    except CycleError as error:
+        sys.exit(str(error))
+    if ARGS.waves:
+        for i, a_wave in enumerate(WAVES):
+            print('Wave {0}:'.format(i + 1))
+            for a_task in a_wave:
+                print('  ' + a_task)
+        STATISTICS = wave_statistics(WAVES)
+        print('Depth: {0}'.format(STATISTICS.depth))
+        print('Maximum Width: {0}'.format(STATISTICS.max_width))
+        print('Average Parallelism: {0:.2f}'.format(
+            STATISTICS.average_parallelism))
+    else:
+        i = 0
+        for one_component_of_scheduled_tasks in COMPONENTS:
+            i += 1
+            print('Independent Task Group {0}:'.format(i))
+            for a_task in one_component_of_scheduled_tasks:
+                print('  ' + a_task)
+    if ARGS.profile:
+        STATS = A_SCHEDULER.stats()
+        for NAME, SECONDS in sorted(STATS.pop('seconds').items()):
+            print('{0}: {1:.6f} s'.format(NAME, SECONDS), file=sys.stderr)
+        for NAME, COUNT in sorted(STATS.items()):
+            print('{0}: {1}'.format(NAME, COUNT), file=sys.stderr)
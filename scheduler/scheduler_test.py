@@ -1,8 +1,16 @@
 """Test Scheduler."""
 
+import functools
+import os
+import tempfile
+import threading
+import time
 import unittest
 
+from cache import BuildCache
+from scheduler import CycleError
 from scheduler import Scheduler
+from scheduler import wave_statistics
 
 
 class TestScheduler(unittest.TestCase):
@@ -86,6 +94,231 @@ class TestScheduler(unittest.TestCase):
         scheduled_tasks = a_scheduler.schedule()
         self.assertEqual(scheduled_tasks, {('A', 'B', 'C'), (1, 2, 3)})
 
+    def test_add_edges(self):
+        """Test adding prerequisites in bulk."""
+        for incremental in (False, True):
+            a_scheduler = Scheduler(incremental=incremental)
+            a_scheduler.add_a_task('A', cost=2)
+            # Build two linked lists:
+            #   A <- B <- C
+            #   1 <- 2
+            a_scheduler.add_edges([('B', 'A'), ('C', 'B'), (2, 1), ('B', 'A')])
+            self.assertEqual(a_scheduler.n_tasks(), 5)
+            self.assertEqual(a_scheduler.schedule(), {('A', 'B', 'C'), (1, 2)})
+            self.assertEqual(a_scheduler.makespan(), 4.0)
+
+    def test_add_invalid_edges(self):
+        """Test that adding invalid prerequisites in bulk adds nothing."""
+        a_scheduler = Scheduler()
+        a_scheduler.add_edges([('B', 'A')])
+        for pairs in ([('C', 'D'), ('E', 'F', 'G')],
+                      [('C', 'D'), (['E'], 'F')]):
+            with self.assertRaises((TypeError, ValueError)):
+                a_scheduler.add_edges(pairs)
+            self.assertEqual(a_scheduler.n_tasks(), 2)
+        a_scheduler.add_edges([('C', 'D')])
+        self.assertEqual(a_scheduler.schedule(), {('A', 'B'), ('D', 'C')})
+        self.assertEqual(a_scheduler.makespan(), 2.0)
+        self.assertEqual(a_scheduler.run(dict()),
+                         {'A': None, 'B': None, 'C': None, 'D': None})
+
+    def test_stats(self):
+        """Test counters and durations of phases in the profiling mode."""
+        a_scheduler = Scheduler(profile=True)
+        a_scheduler.load_todo_list(['B A\n', 'C A B\n', 'D\n'], batch_size=2)
+        a_scheduler.add_a_prerequisite('D', 'C')
+        self.assertEqual(a_scheduler.schedule(), {('A', 'B', 'C', 'D')})
+        stats = a_scheduler.stats()
+        self.assertEqual(stats['edges_added'], 4)
+        self.assertEqual(stats['tasks_sorted'], 4)
+        self.assertTrue(stats['root_compressions'] > 0)
+        self.assertEqual(set(stats['seconds']),
+                         {'parse', 'intern', 'connect', 'sort', 'group'})
+        # Waves and critical paths are also sorted in the 'sort' phase.
+        for method in ('schedule_in_waves', 'critical_path', 'makespan'):
+            a_scheduler = Scheduler(profile=True)
+            a_scheduler.add_edges([('B', 'A'), ('C', 'B')])
+            getattr(a_scheduler, method)()
+            stats = a_scheduler.stats()
+            self.assertEqual(stats['tasks_sorted'], 3)
+            self.assertIn('sort', stats['seconds'])
+            self.assertEqual('group' in stats['seconds'],
+                             method == 'schedule_in_waves')
+        # Profiling is disabled by default.
+        with self.assertRaises(AssertionError):
+            Scheduler().stats()
+
+    def test_load_todo_list(self):
+        """Test loading a todo list."""
+        lines = (
+            '# B depends on A:\n',
+            'B A\n',
+            '\n',
+            '# C depends on A and B:\n',
+            'C A B\n',
+            'D\n',
+            '2 1\n',
+            '3 1 2\n',
+        )
+        a_scheduler = Scheduler()
+        a_scheduler.load_todo_list(lines, batch_size=2)
+        self.assertEqual(a_scheduler.n_tasks(), 7)
+        self.assertEqual(a_scheduler.schedule(),
+                         {('A', 'B', 'C'), ('1', '2', '3'), ('D',)})
+
+    def test_snapshot(self):
+        """Test saving and loading a snapshot."""
+        a_scheduler = Scheduler()
+        # Build two linked lists and a lonely task:
+        #   A <- B <- C
+        #   1 <- 2
+        #   甲
+        a_scheduler.add_edges([('B', 'A'), ('C', 'B'), ('2', '1')])
+        a_scheduler.add_a_task('甲', cost=2.5)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'snapshot.bin')
+            a_scheduler.save_snapshot(path)
+            loaded = Scheduler.load_snapshot(path)
+            self.assertTrue(loaded.frozen())
+            self.assertEqual(loaded.n_tasks(), 6)
+            self.assertEqual(loaded.schedule(), a_scheduler.schedule())
+            self.assertEqual(loaded.timing(), a_scheduler.timing())
+            self.assertTrue(loaded.depends_on('C', 'A'))
+            # Writing to the loaded one does not change the file.
+            loaded.add_a_task('A', cost=5.0)
+            self.assertEqual(loaded.makespan(), 7.0)
+            del loaded
+            self.assertEqual(Scheduler.load_snapshot(path).makespan(), 3.0)
+            # An empty scheduler can also be saved.
+            Scheduler().save_snapshot(path)
+            self.assertEqual(Scheduler.load_snapshot(path).schedule(), set())
+        with self.assertRaises(AssertionError):
+            a_scheduler.add_a_task(1)
+            a_scheduler.save_snapshot(os.devnull)
+
+    def test_schedule_for(self):
+        """Test scheduling only tasks needed by some targets."""
+        a_scheduler = Scheduler()
+        # Build the dependency graph:
+        #   A <- B <- C
+        #    \
+        #     <- D
+        #   1 <- 2
+        a_scheduler.add_edges([('B', 'A'), ('C', 'B'), ('D', 'A'), (2, 1)])
+        self.assertEqual(a_scheduler.schedule_for(['B']), {('A', 'B')})
+        self.assertEqual(a_scheduler.schedule_for(['D', 2]),
+                         {('A', 'D'), (1, 2)})
+        self.assertTrue(a_scheduler.schedule_for(['C', 'D']) in (
+            {('A', 'B', 'C', 'D')}, {('A', 'D', 'B', 'C')},
+            {('A', 'B', 'D', 'C')}))
+        with self.assertRaises(AssertionError):
+            a_scheduler.schedule_for(['E'])
+
+    def test_remove_a_prerequisite(self):
+        """Test removing prerequisites."""
+        for incremental in (False, True):
+            a_scheduler = Scheduler(incremental=incremental)
+            # Build the dependency graph, which is a linked list:
+            #   A <- B <- C
+            a_scheduler.add_edges([('B', 'A'), ('C', 'B')])
+            # Split it into:
+            #   A <- B   C
+            a_scheduler.remove_a_prerequisite(task='C', prerequisite='B')
+            self.assertEqual(a_scheduler.schedule(), {('A', 'B'), ('C',)})
+            self.assertFalse(a_scheduler.depends_on('C', 'A'))
+            # Removing again changes nothing.
+            a_scheduler.remove_a_prerequisite(task='C', prerequisite='B')
+            self.assertEqual(a_scheduler.n_tasks(), 3)
+            # The reversed one no longer makes a cycle.
+            a_scheduler.add_a_prerequisite(task='B', prerequisite='C')
+            self.assertTrue(a_scheduler.schedule() in (
+                {('A', 'C', 'B')}, {('C', 'A', 'B')}))
+            with self.assertRaises(AssertionError):
+                a_scheduler.remove_a_prerequisite(task='D', prerequisite='A')
+
+    def test_remove_after_adding_again(self):
+        """Test removing a prerequisite which has been added twice."""
+        for incremental in (False, True):
+            for add in ('add_a_prerequisite', 'add_edges'):
+                a_scheduler = Scheduler(incremental=incremental)
+                # Build two linked lists:
+                #   A <- B
+                #   X <- C
+                a_scheduler.add_edges([('B', 'A'), ('C', 'X')])
+                # Removing C <- X switches to dynamic components.
+                a_scheduler.remove_a_prerequisite(task='C', prerequisite='X')
+                # Adding B <- A again changes nothing.
+                if add == 'add_edges':
+                    a_scheduler.add_edges([('B', 'A'), ('B', 'A')])
+                else:
+                    a_scheduler.add_a_prerequisite(task='B', prerequisite='A')
+                a_scheduler.remove_a_prerequisite(task='B', prerequisite='A')
+                self.assertEqual(a_scheduler.schedule(),
+                                 {('A',), ('B',), ('C',), ('X',)})
+
+    def test_remove_a_prerequisite_in_cycle(self):
+        """Test breaking a cycle by removing one of its prerequisites."""
+        a_scheduler = Scheduler()
+        # Build a cycle:
+        #   A <- B <- A
+        a_scheduler.add_a_prerequisite(task='A', prerequisite='B')
+        a_scheduler.add_a_prerequisite(task='B', prerequisite='A')
+        with self.assertRaises(CycleError):
+            a_scheduler.schedule()
+        # A still depends on B.
+        a_scheduler.remove_a_prerequisite(task='B', prerequisite='A')
+        self.assertEqual(a_scheduler.schedule(), {('B', 'A')})
+        a_scheduler.remove_a_prerequisite(task='A', prerequisite='B')
+        self.assertEqual(a_scheduler.schedule(), {('A',), ('B',)})
+
+    def test_remove_a_task(self):
+        """Test removing tasks."""
+        a_scheduler = Scheduler()
+        # Build the dependency graph:
+        #   A <- B <- C
+        #   1 <- 2
+        a_scheduler.add_edges([('B', 'A'), ('C', 'B'), ('2', '1')])
+        a_scheduler.add_a_task('C', cost=2)
+        a_scheduler.remove_a_task('B')
+        self.assertEqual(a_scheduler.n_tasks(), 4)
+        self.assertEqual(a_scheduler.schedule(), {('A',), ('C',), ('1', '2')})
+        self.assertEqual(a_scheduler.schedule_in_waves()[1], ('2',))
+        self.assertEqual(a_scheduler.critical_path(), ('C',))
+        self.assertEqual(set(a_scheduler.timing()), {'A', 'C', '1', '2'})
+        self.assertEqual(a_scheduler.run(dict()),
+                         {'A': None, 'C': None, '1': None, '2': None})
+        with self.assertRaises(AssertionError):
+            a_scheduler.remove_a_task('B')
+        # A removed task can be added again.
+        a_scheduler.add_a_prerequisite(task='B', prerequisite='C')
+        a_scheduler.add_a_prerequisite(task='A', prerequisite='B')
+        self.assertEqual(a_scheduler.schedule(), {('C', 'B', 'A'), ('1', '2')})
+        a_scheduler.remove_a_task('2')
+        self.assertEqual(a_scheduler.schedule(), {('C', 'B', 'A'), ('1',)})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'snapshot.bin')
+            a_scheduler.save_snapshot(path)
+            loaded = Scheduler.load_snapshot(path)
+            self.assertEqual(loaded.n_tasks(), 4)
+            self.assertEqual(loaded.schedule(), {('C', 'B', 'A'), ('1',)})
+            self.assertEqual(loaded.makespan(), 4.0)
+
+    def test_reduce(self):
+        """Test removing redundant prerequisites."""
+        a_scheduler = Scheduler()
+        # Build the dependency graph as in todo_list.txt:
+        #   C depends on A and B, and B depends on A.
+        a_scheduler.load_todo_list(['B A', 'C A B', '2 1', '3 1 2'])
+        self.assertEqual(a_scheduler.reduce(), 2)
+        self.assertEqual(a_scheduler.reduce(), 0)
+        self.assertEqual(a_scheduler.schedule(),
+                         {('A', 'B', 'C'), ('1', '2', '3')})
+        self.assertTrue(a_scheduler.depends_on('C', 'A'))
+        # Removing a task still splits the group correctly.
+        a_scheduler.remove_a_task('B')
+        self.assertEqual(a_scheduler.schedule(),
+                         {('A',), ('C',), ('1', '2', '3')})
+
     def test_cycle_detection(self):
         """Test public methods on a task set, which forms a cycle."""
         a_scheduler = Scheduler()
@@ -94,8 +327,289 @@ class TestScheduler(unittest.TestCase):
         a_scheduler.add_a_prerequisite(task='A', prerequisite='B')
         a_scheduler.add_a_prerequisite(task='B', prerequisite='C')
         a_scheduler.add_a_prerequisite(task='C', prerequisite='A')
-        with self.assertRaises(AssertionError):
+        # Build another cycle:
+        #   1 -> 1
+        a_scheduler.add_a_prerequisite(task=1, prerequisite=1)
+        a_scheduler.add_a_prerequisite(task=2, prerequisite=1)
+        cycles = [set(cycle) for cycle in a_scheduler.find_cycles()]
+        self.assertEqual(len(cycles), 2)
+        self.assertTrue({'A', 'B', 'C'} in cycles)
+        self.assertTrue({1} in cycles)
+        with self.assertRaises(CycleError) as context:
             a_scheduler.schedule()
+        self.assertEqual(
+            [set(cycle) for cycle in context.exception.cycles], cycles)
+        for method in (a_scheduler.schedule_in_waves, a_scheduler.timing):
+            with self.assertRaises(CycleError):
+                method()
+
+    def test_depends_on(self):
+        """Test querying dependencies between tasks."""
+        a_scheduler = Scheduler()
+        # Build the dependency graph, which is a linked list:
+        #   A <- B <- C
+        a_scheduler.add_a_prerequisite(task='B', prerequisite='A')
+        self.assertTrue(a_scheduler.depends_on('B', 'A'))
+        self.assertFalse(a_scheduler.depends_on('C', 'A'))
+        a_scheduler.add_a_prerequisite(task='C', prerequisite='B')
+        self.assertTrue(a_scheduler.depends_on('C', 'A'))
+        self.assertFalse(a_scheduler.depends_on('A', 'C'))
+        self.assertEqual(
+            a_scheduler.depends_on_many((('C', 'B'), ('B', 'C'), ('D', 'A'))),
+            (True, False, False))
+        a_scheduler.freeze()
+        self.assertTrue(a_scheduler.depends_on('C', 'A'))
+
+    def test_freeze(self):
+        """Test scheduling after freezing."""
+        a_scheduler = Scheduler()
+        # Build the dependency graph, which is a linked list:
+        #   A <- B <- C
+        a_scheduler.add_a_prerequisite(task='B', prerequisite='A')
+        a_scheduler.add_a_prerequisite(task='C', prerequisite='B')
+        self.assertFalse(a_scheduler.frozen())
+        a_scheduler.freeze()
+        self.assertTrue(a_scheduler.frozen())
+        self.assertEqual(a_scheduler.schedule(), {('A', 'B', 'C')})
+        # Existing tasks can be added again, but new ones cannot.
+        a_scheduler.add_a_task('A')
+        with self.assertRaises(AssertionError):
+            a_scheduler.add_a_task('D')
+        with self.assertRaises(AssertionError):
+            a_scheduler.add_a_prerequisite(task='C', prerequisite='A')
+
+    def test_lonely_task(self):
+        """Test scheduling a task without any prerequisite."""
+        a_scheduler = Scheduler()
+        a_scheduler.add_a_task('A')
+        a_scheduler.add_a_prerequisite(task=2, prerequisite=1)
+        self.assertEqual(a_scheduler.schedule(), {('A',), (1, 2)})
+
+    def test_incremental_mode(self):
+        """Test scheduling while adding prerequisites incrementally."""
+        a_scheduler = Scheduler(incremental=True)
+        # Build the dependency graph, which is a linked list:
+        #   A <- B <- C <- D
+        # in an order against the initial order of tasks.
+        a_scheduler.add_tasks(('D', 'C', 'B', 'A'))
+        self.assertEqual(len(a_scheduler.schedule()), 4)
+        a_scheduler.add_a_prerequisite(task='D', prerequisite='C')
+        a_scheduler.add_a_prerequisite(task='B', prerequisite='A')
+        self.assertEqual(a_scheduler.schedule(), {('C', 'D'), ('A', 'B')})
+        a_scheduler.add_a_prerequisite(task='C', prerequisite='B')
+        self.assertEqual(a_scheduler.schedule(), {('A', 'B', 'C', 'D')})
+        # A cycle is detected on adding.
+        with self.assertRaises(CycleError) as context:
+            a_scheduler.add_a_prerequisite(task='A', prerequisite='D')
+        self.assertEqual(context.exception.cycles, (('A', 'B', 'C', 'D'),))
+        self.assertEqual(a_scheduler.schedule(), {('A', 'B', 'C', 'D')})
+
+    def test_schedule_in_waves(self):
+        """Test grouping tasks into waves."""
+        a_scheduler = Scheduler()
+        self.assertEqual(a_scheduler.schedule_in_waves(), ())
+        self.assertEqual(wave_statistics(()), (0, 0, 0.0))
+        # Build the dependency graph, which consists of two linked lists:
+        #   A <- B <- C
+        #   1 <- 2
+        a_scheduler.add_a_prerequisite(task='B', prerequisite='A')
+        a_scheduler.add_a_prerequisite(task='C', prerequisite='B')
+        a_scheduler.add_a_prerequisite(task=2, prerequisite=1)
+        waves = a_scheduler.schedule_in_waves()
+        self.assertEqual(len(waves), 3)
+        self.assertEqual(set(waves[0]), {'A', 1})
+        self.assertEqual(set(waves[1]), {'B', 2})
+        self.assertEqual(waves[2], ('C',))
+        statistics = wave_statistics(waves)
+        self.assertEqual(statistics.depth, 3)
+        self.assertEqual(statistics.max_width, 2)
+        self.assertAlmostEqual(statistics.average_parallelism, 5 / 3)
+
+    def test_critical_path(self):
+        """Test analyzing the critical path of weighted tasks."""
+        a_scheduler = Scheduler()
+        # Build the dependency graph, whose costs are given in brackets:
+        #   A(2) <- B(3)
+        #   C(1) <- D(1.0 by default)
+        a_scheduler.add_a_task('A', cost=2)
+        a_scheduler.add_a_task('B', cost=3)
+        a_scheduler.add_a_task('C', cost=4)
+        # Update the cost of an existing task.
+        a_scheduler.add_a_task('C', cost=1)
+        a_scheduler.add_a_prerequisite(task='B', prerequisite='A')
+        a_scheduler.add_a_prerequisite(task='D', prerequisite='C')
+        self.assertEqual(a_scheduler.makespan(), 5.0)
+        self.assertEqual(a_scheduler.critical_path(), ('A', 'B'))
+        timing = a_scheduler.timing()
+        self.assertEqual(timing['A'], (0.0, 0.0, 0.0))
+        self.assertEqual(timing['B'], (2.0, 2.0, 0.0))
+        self.assertEqual(timing['C'], (0.0, 3.0, 3.0))
+        self.assertEqual(timing['D'].earliest_start, 1.0)
+        self.assertEqual(timing['D'].latest_start, 4.0)
+        self.assertEqual(timing['D'].slack, 3.0)
+
+    def test_run_by_priority(self):
+        """Test running tasks on a critical path first."""
+        a_scheduler = Scheduler()
+        # Build the dependency graph, whose costs are given in brackets:
+        #   A(5) <- B(5)
+        #   C(1)
+        a_scheduler.add_a_task('C', cost=1)
+        a_scheduler.add_a_task('A', cost=5)
+        a_scheduler.add_a_task('B', cost=5)
+        a_scheduler.add_a_prerequisite(task='B', prerequisite='A')
+        started = list()
+        callable_map = {task: functools.partial(started.append, task)
+                        for task in 'ABC'}
+        a_scheduler.run(callable_map, max_workers=1)
+        self.assertEqual(started, ['A', 'B', 'C'])
+
+    def test_run(self):
+        """Test running tasks concurrently."""
+        a_scheduler = Scheduler()
+        # Build the dependency graph, which is a diamond:
+        #     A
+        #    / \
+        #   B   C
+        #    \ /
+        #     D
+        a_scheduler.add_prerequisites(task='B', prerequisites=('A',))
+        a_scheduler.add_prerequisites(task='C', prerequisites=('A',))
+        a_scheduler.add_prerequisites(task='D', prerequisites=('B', 'C'))
+        a_scheduler.add_a_task('E')
+        finished = list()
+        # B and C can only pass the barrier if they run concurrently.
+        barrier = threading.Barrier(2, timeout=10)
+
+        def make_task(task):
+            def run_a_task():
+                if task in ('B', 'C'):
+                    barrier.wait()
+                finished.append(task)
+                return task.lower()
+            return run_a_task
+        callable_map = {task: make_task(task) for task in 'ABCD'}
+        results = a_scheduler.run(callable_map, max_workers=2)
+        self.assertEqual(results, {'A': 'a', 'B': 'b', 'C': 'c', 'D': 'd',
+                                   'E': None})
+        self.assertEqual(finished[0], 'A')
+        self.assertEqual(finished[3], 'D')
+
+    def test_run_with_resources(self):
+        """Test running tasks within the budgets of CPUs and memory."""
+        a_scheduler = Scheduler()
+        # Build the dependency graph, whose (cpus, memory) are given in
+        # brackets:
+        #   A(1, 6) <- D(2, 0)
+        #   B(1, 6)
+        #   C(1, 2)
+        a_scheduler.add_a_prerequisite(task='D', prerequisite='A')
+        a_scheduler.add_tasks('BC')
+        a_scheduler.set_resources('A', memory=6)
+        a_scheduler.set_resources('B', memory=6)
+        a_scheduler.set_resources('C', memory=2)
+        a_scheduler.set_resources('D', cpus=2)
+        lock = threading.Lock()
+        used = [0, 0]
+        peak = [0, 0]
+
+        def make_task(task):
+            def run_a_task():
+                cpus, memory = {'A': (1, 6), 'B': (1, 6), 'C': (1, 2),
+                                'D': (2, 0)}[task]
+                with lock:
+                    used[0] += cpus
+                    used[1] += memory
+                    peak[0] = max(peak[0], used[0])
+                    peak[1] = max(peak[1], used[1])
+                time.sleep(0.01)
+                with lock:
+                    used[0] -= cpus
+                    used[1] -= memory
+                return task.lower()
+            return run_a_task
+        callable_map = {task: make_task(task) for task in 'ABCD'}
+        results = a_scheduler.run(callable_map, max_workers=4, cpu_slots=2,
+                                  memory_budget=8)
+        self.assertEqual(results, {'A': 'a', 'B': 'b', 'C': 'c', 'D': 'd'})
+        self.assertTrue(peak[0] <= 2)
+        self.assertTrue(peak[1] <= 8)
+        # A task needing more than the whole budget can never run.
+        with self.assertRaises(ValueError):
+            a_scheduler.run(callable_map, cpu_slots=2, memory_budget=4)
+        # The budgets are unlimited by default.
+        results = a_scheduler.run(callable_map, max_workers=4)
+        self.assertEqual(len(results), 4)
+        # So can a task with default resources, i.e. one CPU slot.
+        a_scheduler.add_a_task('E')
+        for cpu_slots in (0, 0.5):
+            with self.assertRaises(ValueError):
+                a_scheduler.run({'E': str}, cpu_slots=cpu_slots)
+        # A task not to be called needs no resources.
+        self.assertEqual(a_scheduler.run(dict(), cpu_slots=0),
+                         {'A': None, 'B': None, 'C': None, 'D': None,
+                          'E': None})
+
+    def test_run_with_cache(self):
+        """Test running only tasks downstream of a change."""
+        a_scheduler = Scheduler()
+        # Build the dependency graph, which is a binary tree:
+        #     A
+        #    / \
+        #   B   C
+        a_scheduler.add_a_prerequisite(task='B', prerequisite='A')
+        a_scheduler.add_a_prerequisite(task='C', prerequisite='A')
+        with tempfile.TemporaryDirectory() as directory:
+            a_cache = BuildCache(os.path.join(directory, 'cache'))
+            path = os.path.join(directory, 'B.txt')
+            with open(path, 'w') as file:
+                file.write('old')
+            started = list()
+
+            def make_task(task):
+                def run_a_task():
+                    started.append(task)
+                    return task.lower()
+                return run_a_task
+            callable_map = {task: make_task(task) for task in 'ABC'}
+            inputs = {'B': (path,)}
+            results = a_scheduler.run(callable_map, cache=a_cache,
+                                      inputs=inputs)
+            self.assertEqual(results, {'A': 'a', 'B': 'b', 'C': 'c'})
+            self.assertEqual(sorted(started), ['A', 'B', 'C'])
+            # Nothing changes, so nothing runs.
+            started.clear()
+            results = a_scheduler.run(callable_map, cache=a_cache,
+                                      inputs=inputs)
+            self.assertEqual(results, {'A': 'a', 'B': 'b', 'C': 'c'})
+            self.assertEqual(started, [])
+            # Only B depends on the changed file.
+            with open(path, 'w') as file:
+                file.write('new')
+            results = a_scheduler.run(callable_map, cache=a_cache,
+                                      inputs=inputs)
+            self.assertEqual(results, {'A': 'a', 'B': 'b', 'C': 'c'})
+            self.assertEqual(started, ['B'])
+
+    def test_run_in_processes(self):
+        """Test running tasks in a pool of processes."""
+        a_scheduler = Scheduler()
+        a_scheduler.add_a_prerequisite(task=2, prerequisite=1)
+        callable_map = {1: functools.partial(pow, 2, 3),
+                        2: functools.partial(pow, 3, 2)}
+        results = a_scheduler.run(callable_map, mode='process')
+        self.assertEqual(results, {1: 8, 2: 9})
+
+    def test_run_with_an_exception(self):
+        """Test running tasks, one of which raises."""
+        a_scheduler = Scheduler()
+        a_scheduler.add_a_prerequisite(task='B', prerequisite='A')
+        finished = list()
+        callable_map = {'A': functools.partial(int, 'A'),
+                        'B': functools.partial(finished.append, 'B')}
+        with self.assertRaises(ValueError):
+            a_scheduler.run(callable_map)
+        self.assertEqual(finished, [])
 
 
 if __name__ == "__main__":